@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 # Evaluation from the paper achieved with python3 -O eval -s0 -p200 -r1000 -n10000
+import functools
 import statistics
 
 from optparse import OptionParser
@@ -9,14 +10,15 @@ import itertools
 import random
 import numpy as np
 import timeit
-from multiprocessing import Pool
 
-import benchmark_WATERS as bench
+# heavy dependencies (scipy in benchmark_WATERS, matplotlib in plot) are imported in the stages which need them
 
-# import analysis as ana
-import analysis_new as ana
+import analysis as ana
 import helpers
-import plot
+import profiling
+import result_cache
+import taskset
+import workers
 
 # set seed
 random.seed(314159)
@@ -46,10 +48,16 @@ class AnaRes:
         mrda_other=None,
         time_our=None,
         time_other=None,
+        counters_our=None,
+        counters_other=None,
+        time_scale=1,
     ):
         # chain
         self.chain = chain
 
+        # the results are in the original time base; the chain is scaled by time_scale (see taskset.transform_exact)
+        self.time_scale = time_scale
+
         # our results
         self.mrt_our = mrt_our
         self.mrrt_our = mrrt_our
@@ -66,6 +74,10 @@ class AnaRes:
         self.time_our = time_our
         self.time_other = time_other
 
+        # work done by the analyses (if counted)
+        self.counters_our = counters_our
+        self.counters_other = counters_other
+
     def check_equal(self):
         return all(
             [
@@ -95,6 +107,13 @@ number_systems_per_util = (
 code_switch = 0
 processes = 1
 repeat_measurement = 100
+profile = False
+count = False
+random_phases = False
+exact_time = False
+use_cache = False
+cache_size = 1_000_000
+fast_paths = False
 # options
 parser = OptionParser()
 parser.add_option(
@@ -128,6 +147,50 @@ parser.add_option(
     type="int",
     help="Number of systems to be created per utilization.",
 )
+parser.add_option(
+    "--profile",
+    dest="profile",
+    action="store_true",
+    help="Profile the untimed analysis call in each worker and merge the stats into one report.",
+)
+parser.add_option(
+    "--count",
+    dest="count",
+    action="store_true",
+    help="Count jobs, job chains, LET help function calls and the analysis window per chain.",
+)
+parser.add_option(
+    "--phases",
+    dest="random_phases",
+    action="store_true",
+    help="Draw random integer phases in [0, period) instead of synchronous releases.",
+)
+parser.add_option(
+    "--exact",
+    dest="exact_time",
+    action="store_true",
+    help="Transform all times to the minimal exact integer time base.",
+)
+parser.add_option(
+    "--cache",
+    dest="use_cache",
+    action="store_true",
+    help="Look up the analysis results of equal chains in a persistent cache (the timing is always measured).",
+)
+parser.add_option(
+    "--cache-size",
+    dest="cache_size",
+    type="int",
+    help="Maximal number of results in the cache.",
+)
+
+parser.add_option(
+    "--fast-paths",
+    dest="fast_paths",
+    action="store_true",
+    help="Use the fast paths for one activation pattern and harmonic chains in our analysis "
+    "(the other analysis is always the enumerating reference).",
+)
 
 (options, args) = parser.parse_args()
 
@@ -143,12 +206,35 @@ if options.repeat_measurement is not None:
 if options.number_systems_per_util is not None:
     number_systems_per_util = options.number_systems_per_util
 
+if options.profile is not None:
+    profile = options.profile
+
+if options.count is not None:
+    count = options.count
+
+if options.random_phases is not None:
+    random_phases = options.random_phases
+
+if options.exact_time is not None:
+    exact_time = options.exact_time
+
+if options.use_cache is not None:
+    use_cache = options.use_cache
+
+if options.cache_size is not None:
+    cache_size = options.cache_size
+
+if options.fast_paths is not None:
+    fast_paths = options.fast_paths
+
 #####
 # Generate tasksets and chains
 #####
 
 if code_switch in [0, 1]:
     """TODO"""  # TODO
+    import benchmark_WATERS as bench
+
     tries_before_abortion = 100
 
     def make_system(tries=None, debug_geq=0):
@@ -171,9 +257,18 @@ if code_switch in [0, 1]:
                 f"Cause-effect chain successfully created after {id} failed attempts."
             )
 
-        # set phases = 0
+        # set phases = 0 (or random phases for asynchronous systems)
         for tsk in ce.base_ts:
-            tsk.rel.phase = 0
+            if random_phases:
+                tsk.rel.phase = random.randrange(int(tsk.rel.period))
+            else:
+                tsk.rel.phase = 0
+        ce.base_ts.invalidate()  # the phases are changed in place
+
+        # exact integer time base of the chain (see taskset.transform_exact), the scale is stored to restore the
+        # results; the other tasks of the task set do not enlarge it
+        if exact_time:
+            ce.time_scale = taskset.transform_exact(ce.base_ts, tasks=ce)
 
         return ce
 
@@ -240,40 +335,78 @@ if code_switch in [0, 2]:
     print(helpers.time_now(), "Load data")
     ces = helpers.load_data(path_out + f"ces.pickle")
 
-    # do experiments
+    # analyses (profiled in each worker if requested)
+    our_all = ana.our_all
+    other_all = ana.other_all
+    if fast_paths:  # see analysis.e2e_dispatch
+        our_all = functools.partial(our_all, fast=True)
+    if profile:
+        path_profile = path_out + "profile/"
+        helpers.check_or_make_directory(path_profile)
+        for name in ["our", "other"]:
+            profiling.clear_stats(path_profile, name)
+        our_all = profiling.Profiled(our_all, path_profile, name="our")
+        other_all = profiling.Profiled(other_all, path_profile, name="other")
+
+    # result cache shared by all workers (see result_cache.py)
+    cache = None
+    if use_cache:
+        helpers.check_or_make_directory(path_out)
+        cache = result_cache.ResultCache(path_out + "result_cache.sqlite", max_entries=cache_size)
+        cache.clear_stats()
+
+    # do experiments (the workers get the configuration once and the chains by index, see workers.py)
     print(helpers.time_now(), "Start our analysis")
-    with Pool(processes) as p:
-        our_results = p.starmap(
-            ana.our_all, zip(ces, itertools.repeat(repeat_measurement))
-        )
+    our_results = workers.run(
+        our_all, ces, processes, path_out + "ces.pickle", repeat_measurement, count, cache
+    )
 
     print(helpers.time_now(), "Start other analysis")
-    with Pool(processes) as p:
-        other_results = p.starmap(
-            ana.other_all, zip(ces, itertools.repeat(repeat_measurement))
-        )
+    other_results = workers.run(
+        other_all, ces, processes, path_out + "ces.pickle", repeat_measurement, count, cache
+    )
+
+    if cache is not None:
+        for name, stats in cache.hit_rates().items():
+            print(helpers.time_now(), f"Cache {name}: {stats['hits']} hits, {stats['misses']} misses,",
+                  f"hit rate {stats['hit_rate']:.1%}")
+
+    if profile:
+        print(helpers.time_now(), "Merge profiles")
+        for name in ["our", "other"]:
+            profiling.merge_stats(
+                path_profile, name, path_out + f"profile_{name}.txt"
+            )
 
     assert (
         len(ces) == len(our_results) == len(other_results)
     ), "length of results and of ce chains does not coincide"
 
-    # match into analysis objects
+    def unscale(value, scale):
+        """Value in the original time base of a chain with time base scaled by (scale)."""
+        return value if scale == 1 else value / scale
+
+    # match into analysis objects (with the results in the original time base)
     print(helpers.time_now(), "Match analysis objects")
     ana_results = []
     for ce, our, other in zip(ces, our_results, other_results):
+        scale = getattr(ce, "time_scale", 1)
         ana_results.append(
             AnaRes(
                 ce,
-                mrt_our=our["mrt"],
-                mrrt_our=our["mrrt"],
-                mda_our=our["mda"],
-                mrda_our=our["mrda"],
-                mrt_other=other["mrt"],
-                mrrt_other=other["mrrt"],
-                mda_other=other["mda"],
-                mrda_other=other["mrda"],
+                mrt_our=unscale(our["mrt"], scale),
+                mrrt_our=unscale(our["mrrt"], scale),
+                mda_our=unscale(our["mda"], scale),
+                mrda_our=unscale(our["mrda"], scale),
+                mrt_other=unscale(other["mrt"], scale),
+                mrrt_other=unscale(other["mrrt"], scale),
+                mda_other=unscale(other["mda"], scale),
+                mrda_other=unscale(other["mrda"], scale),
                 time_our=our["time"],
                 time_other=other["time"],
+                counters_our=our.get("counters"),
+                counters_other=other.get("counters"),
+                time_scale=scale,
             )
         )
 
@@ -288,6 +421,7 @@ if code_switch in [0, 2]:
 
 if code_switch in [0, 3]:
     """TODO"""  # TODO
+    import plot
 
     # Load data
     ana_results = helpers.load_data(path_out + f"ana_results.pickle")
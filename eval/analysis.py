@@ -1,12 +1,22 @@
 """Analysis applied in the evaluation.
 Assumptions:
-- LET
-- periodic"""
+- LET or implicit communication (see communication.py)
+- periodic (with arbitrary integer phases)"""
 import itertools
 import math
 from cechain import CEChain
 import timeit
+import sys
+import communication
+import counters
+import analysis_harmonic
+import helpers
+import partition
+import profiling
+import result_cache
+import transitions
 from task import Task
+from taskset import TaskSetView
 from cechain import CEChain
 
 
@@ -18,44 +28,57 @@ from cechain import CEChain
 class Job:
     """A job."""
 
-    def __init__(self, task=None, number=None):
+    def __init__(self, task, number, comm):
         """Create (number)-th job of a task (task).
+        - comm = communication backend of the task (from the policy table of the chain, see communication.py)
         Assumption: number starts at 0. (0=first job)"""
         self.task = task
         self.number = number
+        self.comm = comm
 
     def __str__(self):
         return f"({self.task}, {self.number})"
 
 
 #####
-# Help functions for LET communication
+# Help functions for communication
+# (the jobs read and write as given by the communication backends of their tasks, see communication.py)
 #####
 
 
 def let_we(job: Job):
-    """Write-event of job under LET."""
-    return job.task.rel.phase + job.task.rel.period * job.number + job.task.dl.dl
+    """Write-event of job under the communication policy of its task."""
+    return job.comm.write_phase + job.comm.period * job.number
 
 
 def let_re(job: Job):
-    """Read-event of job under LET."""
-    return job.task.rel.phase + job.task.rel.period * job.number
+    """Read-event of job under the communication policy of its task."""
+    return job.comm.read_phase + job.comm.period * job.number
 
 
-def let_re_geq(time, task: Task):
-    """Number of earliest job with read-event of (task) at or after (time)."""
-    return max(math.ceil((time - task.rel.phase) / task.rel.period), 0)
+def let_re_geq(time, comm: communication.CommunicationBackend):
+    """Number of earliest job with read-event at or after (time), for the task with communication backend (comm)."""
+    return max(int(-((comm.read_phase - time) // comm.period)), 0)
 
 
-def let_re_gt(time, task: Task):
-    """Number of earliest job with read-event of (task) after (time)."""
-    return max(math.floor((time - task.rel.phase) / task.rel.period) + 1, 0)
+def let_re_gt(time, comm: communication.CommunicationBackend):
+    """Number of earliest job with read-event after (time), for the task with communication backend (comm)."""
+    return max(int((time - comm.read_phase) // comm.period) + 1, 0)
 
 
-def let_we_leq(time, task: Task):
-    """Number of latest job with write-event of (task) at or before (time)."""
-    return math.floor((time - task.rel.phase - task.dl.dl) / task.rel.period)
+def let_we_leq(time, comm: communication.CommunicationBackend):
+    """Number of latest job with write-event at or before (time), for the task with communication backend (comm)."""
+    return int((time - comm.write_phase) // comm.period)
+
+
+#####
+# Analysis window
+#####
+
+
+def analysis_window(chain: CEChain):
+    """End of the analysis interval: two hyperperiods plus the maximal phase."""
+    return 2 * chain.hyperperiod() + chain.max_phase()
 
 
 #####
@@ -81,24 +104,36 @@ class JobChain(list):
 class FwJobChain(JobChain):
     """Immediate forward job chain."""
 
-    def __init__(self, ce_chain: CEChain, number: int):
-        """Create (number)-th immediate forward job chain. (under LET)"""
+    def __init__(self, ce_chain: CEChain, number: int, comms=None):
+        """Create (number)-th immediate forward job chain.
+        - ce_chain = cause-effect chain or view of it (see TaskSet.view())
+        - comms = policy table of the (viewed) chain (see communication.policy_table())
+        The jobs are constructed from the backends only, i.e., ce_chain is neither sliced nor iterated."""
         self.number = number  # number of forward job chain
 
-        if len(ce_chain) == 0:
+        if isinstance(ce_chain, TaskSetView):
+            start, stop = ce_chain.start, ce_chain.stop
+            ce_chain = ce_chain.taskset
+        else:
+            start, stop = 0, None
+        if comms is None:
+            comms = communication.policy_table(ce_chain)
+        if stop is None:
+            stop = len(comms)
+
+        if stop == start:
             super().__init__()
             return
 
         # first job
-        job_lst = [Job(ce_chain[0], number)]
+        job_lst = [None] * (stop - start)
+        job = job_lst[0] = Job(comms[start].task, number, comms[start])
 
         # next jobs
-        for tsk in ce_chain[1:]:
+        for idx in range(start + 1, stop):
+            comm = comms[idx]
             # find next job
-            next_job_number = let_re_geq(let_we(job_lst[-1]), tsk)
-
-            # add job to chain
-            job_lst.append(Job(tsk, next_job_number))
+            job = job_lst[idx - start] = Job(comm.task, let_re_geq(let_we(job), comm), comm)
 
         # Make job chain
         super().__init__(*job_lst)
@@ -107,24 +142,36 @@ class FwJobChain(JobChain):
 class BwJobChain(JobChain):
     """Immediate backward job chain."""
 
-    def __init__(self, ce_chain: CEChain, number: int):
-        """Create (number)-th immediate backward job chain. (under LET)"""
+    def __init__(self, ce_chain: CEChain, number: int, comms=None):
+        """Create (number)-th immediate backward job chain.
+        - ce_chain = cause-effect chain or view of it (see TaskSet.view())
+        - comms = policy table of the (viewed) chain (see communication.policy_table())
+        The jobs are filled in reverse into a preallocated list."""
         self.number = number  # number of backward job chain
 
-        if len(ce_chain) == 0:
+        if isinstance(ce_chain, TaskSetView):
+            start, stop = ce_chain.start, ce_chain.stop
+            ce_chain = ce_chain.taskset
+        else:
+            start, stop = 0, None
+        if comms is None:
+            comms = communication.policy_table(ce_chain)
+        if stop is None:
+            stop = len(comms)
+
+        if stop == start:
             super().__init__()
             return
 
         # last job
-        job_lst = [Job(ce_chain[-1], number)]
+        job_lst = [None] * (stop - start)
+        job = job_lst[-1] = Job(comms[stop - 1].task, number, comms[stop - 1])
 
-        # previous jobs jobs
-        for tsk in ce_chain[0:-1][::-1]:  # backwards except the last
+        # previous jobs
+        for idx in range(stop - 2, start - 1, -1):
+            comm = comms[idx]
             # find previous job
-            previous_job_number = let_we_leq(let_re(job_lst[0]), tsk)
-
-            # add job to chain
-            job_lst.insert(0, Job(tsk, previous_job_number))
+            job = job_lst[idx - start] = Job(comm.task, let_we_leq(let_re(job), comm), comm)
 
         # Make job chain
         super().__init__(*job_lst)
@@ -137,17 +184,87 @@ class BwJobChain(JobChain):
 # Find Fi
 #####
 def find_fi(ce_chain: CEChain) -> list[int]:
-    """List of Fi values."""
-    # one forward chain
-    fc = FwJobChain(ce_chain, 0)
-    F = fc[-1].number
-    # one backward chain
-    bc = BwJobChain(ce_chain, F)
-
-    Fi = [job.number for job in bc]
+    """List of Fi values.
+    Only the job numbers of one immediate forward and one immediate backward job chain are computed (no jobs)."""
+    comms = communication.policy_table(ce_chain)
+    length = len(comms)
+
+    # last job number of the forward job chain of the first job
+    F = 0
+    for idx in range(1, length):
+        F = let_re_geq(comms[idx - 1].we(F), comms[idx])
+
+    # job numbers of the backward job chain of job F
+    Fi = [0] * length
+    Fi[-1] = F
+    for idx in range(length - 2, -1, -1):
+        Fi[idx] = let_we_leq(comms[idx + 1].re(Fi[idx + 1]), comms[idx])
     return Fi
 
 
+#####
+# Upper bounds
+#####
+
+
+def _int_pair_params(comm, next_comm):
+    """Period, next period, write phase and next read phase of a task pair (given by their communication backends)
+    as ints. None if not all of them are integral."""
+    vals = [comm.period, next_comm.period, comm.write_phase, next_comm.read_phase]
+    if all(float(val).is_integer() for val in vals):
+        return [int(val) for val in vals]
+    return None
+
+
+def let_fw_wait_bound(comm, next_comm):
+    """Upper bound on the time from a write-event of a task to the earliest read-event of the next task at or after it.
+    For integral parameters, only multiples of gcd(periods) (shifted by the phases) can occur."""
+    params = _int_pair_params(comm, next_comm)
+    if params is None:
+        return next_comm.period
+    period, next_period, write_phase, next_read_phase = params
+    g = math.gcd(period, next_period)
+    return next_period - g + (next_read_phase - write_phase) % g
+
+
+def let_bw_wait_bound(comm, next_comm):
+    """Upper bound on the time from the latest write-event of a task at or before a read-event of the next task to it.
+    """
+    params = _int_pair_params(comm, next_comm)
+    if params is None:
+        return comm.period
+    period, next_period, write_phase, next_read_phase = params
+    g = math.gcd(period, next_period)
+    return period - g + (next_read_phase - write_phase) % g
+
+
+def let_part_bound(chain: CEChain, part: int):
+    """Upper bound on the length of partitioned job chains with partitioning at (part).
+    Backward waits before the partitioning, forward waits after it, plus the time from read- to write-event of all
+    tasks and one period of chain[part].
+    """
+    comms = communication.policy_table(chain)
+    return (
+        chain[part].rel.period
+        + sum(comm.write_offset - comm.read_offset for comm in comms)
+        + sum(let_bw_wait_bound(comms[idx], comms[idx + 1]) for idx in range(part))
+        + sum(
+            let_fw_wait_bound(comms[idx], comms[idx + 1])
+            for idx in range(part, len(chain) - 1)
+        )
+    )
+
+
+def let_mrt_bound(chain: CEChain):
+    """Upper bound on the length of immediate forward augmented job chains (and hence the MRT)."""
+    return let_part_bound(chain, 0)
+
+
+def let_mda_bound(chain: CEChain):
+    """Upper bound on the length of immediate backward augmented job chains (and hence the MDA)."""
+    return let_part_bound(chain, len(chain) - 1)
+
+
 #####
 # Standard LET analysis (G21)
 #####
@@ -187,8 +304,9 @@ class FwAugmJobChain(AugmJobChain):
 
     def __init__(self, ce_chain: CEChain, number: int):
         """Create the (number)-th immediate forward augmented job chain."""
-        ext_act = let_re(Job(ce_chain[0], number))
-        job_chain = FwJobChain(ce_chain, number + 1)
+        comms = communication.policy_table(ce_chain)
+        ext_act = let_re(Job(ce_chain[0], number, comms[0]))
+        job_chain = FwJobChain(ce_chain, number + 1, comms)
         actuation = let_we(job_chain[-1])
 
         super().__init__(ext_act, job_chain, actuation, base_ce_chain=ce_chain)
@@ -199,8 +317,9 @@ class BwAugmJobChain(AugmJobChain):
 
     def __init__(self, ce_chain: CEChain, number: int):
         """Create the (number)-th immediate backward augmented job chain."""
-        actuation = let_we(Job(ce_chain[-1], number))
-        job_chain = BwJobChain(ce_chain, number - 1)
+        comms = communication.policy_table(ce_chain)
+        actuation = let_we(Job(ce_chain[-1], number, comms[-1]))
+        job_chain = BwJobChain(ce_chain, number - 1, comms)
         ext_act = let_re(job_chain[0])
 
         super().__init__(ext_act, job_chain, actuation, base_ce_chain=ce_chain)
@@ -214,24 +333,25 @@ def other_mrt(chain, add_mrrt=False):
     F1 = find_fi(chain)[0]
 
     # find analysis interval
-    analysis_end = 2 * chain.hyperperiod() + chain.max_phase()
-
-    # construct forward chains
-    fw_augm_jcs = []
-    for number in itertools.count(start=F1):
-        fw = FwAugmJobChain(chain, number)
-        if fw.ext_act <= analysis_end:
-            fw_augm_jcs.append(fw)
-        else:
-            break
+    analysis_end = analysis_window(chain)
+
+    # construct forward chains (lazily)
+    fw_augm_jcs = itertools.takewhile(
+        lambda fac: fac.ext_act <= analysis_end,
+        (FwAugmJobChain(chain, number) for number in itertools.count(start=F1)),
+    )
+
+    # upper bound to stop early
+    bound = let_mrt_bound(chain)
 
     if add_mrrt:  # return tuple of mrt and mrrt
-        return (
-            max([fac.ell() for fac in fw_augm_jcs]),  # mrt
-            max([fac.ellstar() for fac in fw_augm_jcs]),
-        )  # mrrt
+        return helpers.running_max(
+            fw_augm_jcs,
+            [AugmJobChain.ell, AugmJobChain.ellstar],  # mrt, mrrt
+            bounds=[bound, bound - chain[0].rel.period],
+        )
     else:  # return only mrt
-        return max([fac.ell() for fac in fw_augm_jcs])  # mrt
+        return helpers.running_max(fw_augm_jcs, [AugmJobChain.ell], bounds=[bound])[0]
 
 
 def other_mda(chain, add_mrda=False):
@@ -240,24 +360,28 @@ def other_mda(chain, add_mrda=False):
     FE = find_fi(chain)[-1]
 
     # find analysis interval
-    analysis_end = 2 * chain.hyperperiod() + chain.max_phase()
-
-    # construct backward chains
-    bw_augm_jcs = []
-    for number in itertools.count(start=FE + 1):
-        bw = BwAugmJobChain(chain, number)
-        if bw.ext_act <= analysis_end:
-            bw_augm_jcs.append(bw)
-        else:
-            break
+    analysis_end = analysis_window(chain)
+
+    # construct complete backward chains (lazily)
+    bw_augm_jcs = filter(
+        lambda bac: bac.complete,
+        itertools.takewhile(
+            lambda bac: bac.ext_act <= analysis_end,
+            (BwAugmJobChain(chain, number) for number in itertools.count(start=FE + 1)),
+        ),
+    )
+
+    # upper bound to stop early
+    bound = let_mda_bound(chain)
 
     if add_mrda:  # return tuple of mda and mrda
-        return (
-            max([bac.ell() for bac in bw_augm_jcs if bac.complete]),  # mda
-            max([bac.ellstar() for bac in bw_augm_jcs if bac.complete]),
-        )  # mrda
-    else:  # return only mrt
-        return max([bac.ell() for bac in bw_augm_jcs if bac.complete])  # mda
+        return helpers.running_max(
+            bw_augm_jcs,
+            [AugmJobChain.ell, AugmJobChain.ellstar],  # mda, mrda
+            bounds=[bound, bound - chain[-1].rel.period],
+        )
+    else:  # return only mda
+        return helpers.running_max(bw_augm_jcs, [AugmJobChain.ell], bounds=[bound])[0]
 
 
 #####
@@ -272,8 +396,9 @@ class PartitionedJobChain:
         - chain = cause-effect chain
         - number = which chain"""
         assert 0 <= part < len(chain), "part is out of possible interval"
-        self.bw = BwJobChain(chain[: part + 1], number)
-        self.fw = FwJobChain(chain[part:], number + 1)  # forward job chain part
+        comms = communication.policy_table(chain)
+        self.bw = BwJobChain(chain.view(0, part + 1), number, comms)  # backward job chain part
+        self.fw = FwJobChain(chain.view(part), number + 1, comms)  # forward job chain part
         self.complete = self.bw.complete  # complete iff bw chain complete
         self.base_ce_chain = chain
 
@@ -286,43 +411,58 @@ class PartitionedJobChain:
         return let_we(self.fw[-1]) - let_re(self.bw[0])
 
 
+def count_part_chains(chain: CEChain, Fi: list[int], analysis_end) -> list[int]:
+    """Number of partitioned job chains in the analysis interval, for each point of partitioning.
+    The chains with partitioning at (part) start at job Fi[part] of chain[part] and end before the job of chain[part]
+    in the immediate forward job chain of the first job of chain[0] with read-event after the analysis interval.
+    (A backward job chain starts at or before job k of chain[0] iff its last job is before the forward job chain
+    of job k+1.)"""
+    fc = FwJobChain(chain, let_re_gt(analysis_end, communication.policy_table(chain)[0]))
+    return [job.number - fi for job, fi in zip(fc, Fi)]
+
+
+def plan_partition(chain: CEChain, Fi: list[int], analysis_end) -> partition.PartitionPlan:
+    """Point of partitioning with the least work over the analysis interval.
+    Works for arbitrary phases."""
+    return partition.PartitionPlan(chain, count_part_chains(chain, Fi, analysis_end))
+
+
 def our_e2e(chain: CEChain, Fi=None) -> float:
     """Compute MRT or MDA as in our paper using result X # TODO add definition/equation
-    - optimized p for periodic synchrnous let tasks
+    - periodic let tasks with arbitrary (integer) phases
     """
     # Construct F_i
     if Fi is None:
         Fi = find_fi(chain)
 
     # find analysis interval
-    analysis_end = 2 * chain.hyperperiod() + chain.max_phase()
+    analysis_end = analysis_window(chain)
 
     # choose point for partitioning
-    # for synchronous let just choose the task with highest period
-    periods = [tsk.rel.period for tsk in chain]
-    part = periods.index(max(periods))
-
-    # construct partitioned chains
-    part_chains = []
-    for number in itertools.count(start=Fi[part]):
-        pc = PartitionedJobChain(part, chain, number)
-        if let_re(pc.bw[0]) <= analysis_end:
-            part_chains.append(pc)
-        else:
-            break
+    plan = plan_partition(chain, Fi, analysis_end)
+    part = plan.part
 
-    assert all(pc.complete for pc in part_chains)
-    return max([pc.ell() for pc in part_chains])
+    # construct partitioned chains (lazily), their number in the analysis interval is known
+    part_chains = (
+        PartitionedJobChain(part, chain, number)
+        for number in range(Fi[part], Fi[part] + plan.counts[part])
+    )
+
+    # all partitioned chains are complete, since the first job numbers only increase
+    assert Fi[0] >= 0
+    return helpers.running_max(
+        part_chains, [PartitionedJobChain.ell], bounds=[let_part_bound(chain, part)]
+    )[0]
 
 
 def compute_mrrt(chain: CEChain, mrt: float = None) -> float:
     """Compute MRRT using the result from X # TODO add result
-    Assumption: LET communication
+    Assumption: LET or implicit communication (fixed read offset of the first task)
     """
     if mrt is None:  # Compute MRT if not given
         mrt = our_mrt(chain)
 
-    # difference between MRT and MRRT under LET is one period of the first task
+    # difference between MRT and MRRT is one period of the first task
     mrrt = mrt - chain[0].rel.period
 
     return mrrt
@@ -330,27 +470,84 @@ def compute_mrrt(chain: CEChain, mrt: float = None) -> float:
 
 def compute_mrda(chain: CEChain, mda: float = None) -> float:
     """Compute MRDA using the result from X # TODO add result
-    Assumption: LET communication
+    Assumption: LET or implicit communication (fixed write offset of the last task)
     """
     if mda is None:  # Compute MRT if not given
         mda = our_mda(chain)
 
-    # difference between MRT and MRRT under LET is one period of the last task
+    # difference between MDA and MRDA is one period of the last task
     mrda = mda - chain[-1].rel.period
 
     return mrda
 
 
+#####
+# Fast paths for few activation patterns and harmonic chains
+#####
+
+
+def single_pattern_e2e(chain: CEChain) -> float:
+    """Compute MRT or MDA of a chain with one activation pattern (all tasks have period T) in closed form.
+    All job chains coincide up to a shift by T: after its write-event, each task waits
+    (read phase of the next task - write phase) mod T for the next task.
+    Under synchronous LET: T + sum(ceil(dl_i / T) * T for all but the last task) + dl_last."""
+    comms = communication.policy_table(chain)
+    period = comms[0].period
+    return (
+        period
+        + sum(comm.write_phase - comm.read_phase for comm in comms)
+        + sum((comms[idx + 1].read_phase - comms[idx].write_phase) % period for idx in range(len(comms) - 1))
+    )
+
+
+def e2e_dispatch(chain: CEChain) -> float:
+    """Compute MRT or MDA with the fastest applicable method:
+    - one activation pattern: single_pattern_e2e()
+    - harmonic chains: analysis_harmonic.harmonic_e2e() (one partitioned job chain)
+    - otherwise: our_e2e(), which enumerates all partitioned job chains in the analysis window"""
+    if len(set(comm.period for comm in communication.policy_table(chain))) == 1:
+        return single_pattern_e2e(chain)
+    params = analysis_harmonic.harmonic_params(chain)
+    if params is not None:
+        return analysis_harmonic.harmonic_e2e(chain, params)
+    return our_e2e(chain)
+
+
+def other_mrt_dispatch(chain, add_mrrt=False):
+    """other_mrt() with the augmented job chains of one maximal period for harmonic chains
+    (see analysis_harmonic.harmonic_mrt())."""
+    params = analysis_harmonic.harmonic_params(chain)
+    if params is not None:
+        return analysis_harmonic.harmonic_mrt(chain, add_mrrt, params)
+    return other_mrt(chain, add_mrrt)
+
+
+def other_mda_dispatch(chain, add_mrda=False):
+    """other_mda() with the augmented job chains of one maximal period for harmonic chains
+    (see analysis_harmonic.harmonic_mda())."""
+    params = analysis_harmonic.harmonic_params(chain)
+    if params is not None:
+        return analysis_harmonic.harmonic_mda(chain, add_mrda, params)
+    return other_mda(chain, add_mrda)
+
+
 #####
 # For our analysis:
 #####
 
 
-def our_all(ce, repeat=10):
-    """Return list of MDA, MRDA, MRT, and MRRT results for our analysis, plus a timer value."""
+def our_all(ce, repeat=10, count=False, cache=None, profiler=None, fast=False):
+    """Return list of MDA, MRDA, MRT, and MRRT results for our analysis, plus a timer value.
+    If count is True, the work done by the analysis is counted as well (see counters.py).
+    If a cache is given, the results are looked up by the chain signature (see result_cache.py), but not the timing.
+    If a profiler is given, the untimed analysis call is profiled (see profiling.py), but not the timing.
+    If fast is True, MRT and MDA are computed by e2e_dispatch(), i.e., with the fast paths for one activation pattern
+    and harmonic chains; otherwise by our_e2e().
+    """
+    e2e_fct = e2e_dispatch if fast else our_e2e
 
-    def analyses(ce):
-        res_our_mda = our_e2e(ce)
+    def analyses(ce, e2e=e2e_fct):
+        res_our_mda = e2e(ce)
         res_our_mrt = res_our_mda
         return {
             "mda": res_our_mda,
@@ -360,20 +557,32 @@ def our_all(ce, repeat=10):
         }
 
     # our analysis
-    result = analyses(ce)
+    result = profiling.runcall(profiler, analyses, ce, result_cache.cached(e2e_fct, cache))
 
     # timing
     result["time"] = min(timeit.repeat(lambda: analyses(ce), repeat=repeat, number=1))
 
+    # counting (separate from timing)
+    if count:
+        with counters.counting(sys.modules[__name__], analysis_harmonic) as counter:
+            analyses(ce)
+        result["counters"] = dict(counter)
+
     return result
 
 
-def other_all(ce, repeat=10):
-    """Return list of MDA, MRDA, MRT, and MRRT results for other analysis, plus a timer value."""
+def other_all(ce, repeat=10, count=False, cache=None, profiler=None):
+    """Return list of MDA, MRDA, MRT, and MRRT results for other analysis, plus a timer value.
+    If count is True, the work done by the analysis is counted as well (see counters.py).
+    If a cache is given, the results are looked up by the chain signature (see result_cache.py), but not the timing.
+    If a profiler is given, the untimed analysis call is profiled (see profiling.py), but not the timing.
+    This is the reference for the speedup, hence always the enumerating analyses other_mda() and other_mrt()
+    (without the fast paths of other_mda_dispatch() and other_mrt_dispatch()).
+    """
 
-    def analyses(ce):
-        res_other_mda_mrda = other_mda(ce, add_mrda=True)
-        res_other_mrt_mrrt = other_mrt(ce, add_mrrt=True)
+    def analyses(ce, mda=other_mda, mrt=other_mrt):
+        res_other_mda_mrda = mda(ce, True)  # add_mrda
+        res_other_mrt_mrrt = mrt(ce, True)  # add_mrrt
         return {
             "mda": res_other_mda_mrda[0],
             "mrda": res_other_mda_mrda[1],
@@ -382,14 +591,87 @@ def other_all(ce, repeat=10):
         }
 
     # other analysis
-    result = analyses(ce)
+    result = profiling.runcall(
+        profiler,
+        analyses,
+        ce,
+        result_cache.cached(other_mda, cache),
+        result_cache.cached(other_mrt, cache),
+    )
 
     # timing
     result["time"] = min(timeit.repeat(lambda: analyses(ce), repeat=repeat, number=1))
 
+    # counting (separate from timing)
+    if count:
+        with counters.counting(sys.modules[__name__], analysis_harmonic) as counter:
+            analyses(ce)
+        result["counters"] = dict(counter)
+
     return result
 
 
+#####
+# Batch analysis with transition tables
+#####
+
+
+def our_e2e_tables(chain: CEChain) -> float:
+    """Compute MRT or MDA as our_e2e(), but compose all job chains by lookups in (cached) transition tables."""
+    comms = communication.policy_table(chain)
+    pair_tables = transitions.chain_tables(chain)
+
+    # Construct F_i
+    Fi = transitions.backward_numbers(
+        pair_tables, transitions.forward_number(pair_tables, 0)
+    )
+    assert Fi[0] >= 0
+
+    # find analysis interval
+    analysis_end = analysis_window(chain)
+
+    # choose point for partitioning
+    last_numbers = transitions.forward_numbers(
+        pair_tables, let_re_gt(analysis_end, comms[0])
+    )
+    plan = partition.PartitionPlan(
+        chain, [last - fi for last, fi in zip(last_numbers, Fi)]
+    )
+    part = plan.part
+    bw_tables = pair_tables[:part]
+    fw_tables = pair_tables[part:]
+
+    # length of the partitioned job chains: from first read-event to last write-event
+    first_tsk, last_tsk = chain[0], chain[-1]
+    lengths = (
+        let_we(Job(last_tsk, transitions.forward_number(fw_tables, number + 1), comms[-1]))
+        - let_re(Job(first_tsk, transitions.backward_number(bw_tables, number), comms[0]))
+        for number in range(Fi[part], Fi[part] + plan.counts[part])
+    )
+    return helpers.running_max(
+        lengths, [lambda length: length], bounds=[let_part_bound(chain, part)]
+    )[0]
+
+
+def our_e2e_tables_all(chains: list[CEChain]) -> list[dict]:
+    """Return MDA, MRDA, MRT, and MRRT results of our analysis for many chains, one dictionary per chain.
+    All chains share the transition tables of task pairs with the same LET signatures.
+    (Stage 2 of __main__.py times our_all() per chain; for arrays over many chains see analysis_batch.our_batch().)"""
+    results = []
+    for ce in chains:
+        res_our_mda = our_e2e_tables(ce)
+        res_our_mrt = res_our_mda
+        results.append(
+            {
+                "mda": res_our_mda,
+                "mrda": compute_mrda(ce, res_our_mda),
+                "mrt": res_our_mrt,
+                "mrrt": compute_mrrt(ce, res_our_mrt),
+            }
+        )
+    return results
+
+
 if __name__ == "__main__":
     """Debug"""
     debug_switch = 0
@@ -405,6 +687,16 @@ if __name__ == "__main__":
             tsk.rel.phase = 0
         return ce, ts
 
+    def make_long_ce_test(number_chains=3):
+        """Concatenation of several cause-effect chains over the same task set."""
+        ce, ts = make_ce_test()
+        for _ in range(number_chains - 1):
+            ce_add = None
+            while ce_add is None:
+                ce_add = bw.gen_ce_chain(ts)
+            ce = CEChain(*ce, *ce_add, base_ts=ts)
+        return ce, ts
+
     if debug_switch in [0, 1]:
         ce, ts = make_ce_test()
 
@@ -474,29 +766,13 @@ if __name__ == "__main__":
                 "our:", o_mda, compute_mrda(ce, o_mda), o_mrt, compute_mrrt(ce, o_mrt)
             )
 
-    if debug_switch in [0, 4]:
-        range_number = 1000
-        for id in range(range_number):
-            # test sample
-            ce, _ = make_ce_test()
+    if debug_switch in [0, 4]:  # Compare other and our analysis (see difftest.py)
+        import difftest
 
-            # other analysis
-            res_other = [*other_mda(ce, add_mrda=True), *other_mrt(ce, add_mrrt=True)]
-            # our analysis
-            res_our_mda = our_e2e(ce)
-            res_our_mrt = res_our_mda
-            res_our = [
-                res_our_mda,
-                compute_mrda(ce, res_our_mda),
-                res_our_mrt,
-                compute_mrrt(ce, res_our_mrt),
-            ]
-            # compare values
-            if not all([x == y for x, y in zip(res_other, res_our)]):
-                print("not equal")
-                breakpoint()
-            if (id + 1) % (range_number / 10) == 0:
-                print(id + 1, "already checked")
+        failures = difftest.run(number=1000, pairs=[("other", "our")])
+        difftest.report(failures)
+        if failures:
+            breakpoint()
 
     if debug_switch in [0, 5]:  # Test timing behavior
         import timeit
@@ -536,4 +812,90 @@ if __name__ == "__main__":
         for ce in ce_tests:
             print(ce, our_all(ce), other_all(ce))
 
+    if debug_switch in [0, 7]:  # Partitioning plan for long chains
+        import numpy as np
+
+        ce_tests = [make_long_ce_test()[0] for _ in range(10)]
+
+        # fit cost per partitioned job chain: constant + per backward job + per forward job
+        rows, times = [], []
+        for ce in ce_tests:
+            for part in range(len(ce)):
+                rows.append([1, part + 1, len(ce) - part])
+                times.append(
+                    min(
+                        timeit.repeat(
+                            lambda: PartitionedJobChain(part, ce, 5).ell(),
+                            repeat=3,
+                            number=100,
+                        )
+                    )
+                )
+        coeffs = np.linalg.lstsq(np.array(rows), np.array(times), rcond=None)[0]
+        print("fitted costs (chain, bw job, fw job):", coeffs / coeffs[2])
+
+        # predicted vs actual number of partitioned job chains
+        for ce in ce_tests:
+            with counters.counting(sys.modules[__name__]) as counter:
+                our_e2e(ce)
+            print(
+                f"length={len(ce)}",
+                f"predicted={counter['part_chains_predicted']}",
+                f"actual={counter['PartitionedJobChain']}",
+                f"max-period heuristic={counter['part_chains_max_period']}",
+                f"work ratio={counter['work_predicted'] / counter['work_max_period']:.2f}",
+            )
+
+    if debug_switch in [0, 8]:  # Job chain construction for long chains
+        import timeit
+
+        def per_call(fct):
+            """Time per call in ms."""
+            return min(timeit.repeat(fct, repeat=5, number=100)) * 10
+
+        for number_chains in [1, 5, 20, 50]:
+            ce, _ = make_long_ce_test(number_chains)
+            F = find_fi(ce)[-1]
+            print(
+                f"length={len(ce)}",
+                f"find_fi={per_call(lambda: find_fi(ce)):.3f}ms",
+                f"FwJobChain={per_call(lambda: FwJobChain(ce, 0)):.3f}ms",
+                f"BwJobChain={per_call(lambda: BwJobChain(ce, F)):.3f}ms",
+            )
+
+    if debug_switch in [0, 9]:  # Fast paths of the dispatchers (chains as in __main__.py)
+        import collections
+        import timeit
+
+        def other(ce, mda=other_mda, mrt=other_mrt):
+            return mda(ce, True), mrt(ce, True)
+
+        # (activation patterns, harmonic) -> [time our_e2e, time e2e_dispatch, time other, time other dispatch, chains]
+        times = collections.defaultdict(lambda: [0.0, 0.0, 0.0, 0.0, 0])
+        for _ in range(300):
+            ce = None
+            while ce is None:
+                ts = bw.gen_taskset_periods(50)
+                ce = bw.gen_ce_chain(ts)
+            for tsk in ts:
+                tsk.rel.phase = 0
+            assert e2e_dispatch(ce) == our_e2e(ce)
+            assert other(ce) == other(ce, other_mda_dispatch, other_mrt_dispatch)
+
+            entry = times[len(ce.involved_activation_patterns()), analysis_harmonic.is_harmonic(ce)]
+            entry[0] += min(timeit.repeat(lambda: our_e2e(ce), repeat=3, number=1))
+            entry[1] += min(timeit.repeat(lambda: e2e_dispatch(ce), repeat=3, number=1))
+            entry[2] += min(timeit.repeat(lambda: other(ce), repeat=3, number=1))
+            entry[3] += min(timeit.repeat(lambda: other(ce, other_mda_dispatch, other_mrt_dispatch), repeat=3, number=1))
+            entry[4] += 1
+
+        for (patterns, harmonic), (our, our_dispatch, oth, oth_dispatch, number) in sorted(times.items()):
+            print(
+                f"patterns={patterns}",
+                f"harmonic={harmonic}",
+                f"chains={number}",
+                f"speedup our={our / our_dispatch:.1f}",
+                f"speedup other={oth / oth_dispatch:.1f}",
+            )
+
     breakpoint()
@@ -0,0 +1,235 @@
+"""Batched analysis of many cause-effect chains with NumPy.
+Same results as our_e2e() in analysis.py, but all chains of a group are analyzed at once on padded integer arrays.
+Assumptions:
+- LET or implicit communication (see communication.py)
+- periodic
+- integral periods, phases and deadlines"""
+import numpy as np
+
+import communication
+import partition
+
+# maximal number of partitioned job chains analyzed at once
+MAX_GROUP_CHAINS = 1_000_000
+
+
+#####
+# Packing
+#####
+
+
+def _int_array(values):
+    """Values as int64 array. The batched analysis requires integral values."""
+    arr = np.asarray(values, dtype=float)
+    assert np.all(arr == np.floor(arr)), "Not all values are integers."
+    return arr.astype(np.int64)
+
+
+class PackedChains:
+    """Chains packed into 2-D arrays (one row per chain), padded to the maximal chain length."""
+
+    def __init__(self, chains):
+        """Pack the periods, read phases and times from read- to write-event (deadlines under LET) of (chains)."""
+        self.lengths = np.array([len(ce) for ce in chains], dtype=np.int64)
+        assert np.all(self.lengths > 0)
+        width = int(self.lengths.max())
+
+        # padding: period 1, phase 0, deadline 0 (neutral for hyperperiod and maximal phase)
+        tables = [communication.policy_table(ce) for ce in chains]
+
+        def padded(fct, pad):
+            return _int_array([[fct(comm) for comm in table] + [pad] * (width - len(table)) for table in tables])
+
+        self.period = padded(lambda comm: comm.period, 1)
+        self.phase = padded(lambda comm: comm.read_phase, 0)
+        self.dl = padded(lambda comm: comm.write_phase - comm.read_phase, 0)
+
+        self.rows = np.arange(len(chains))
+        self.last = self.lengths - 1  # index of the last task
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def analysis_window(self):
+        """End of the analysis interval per chain: two hyperperiods plus the maximal phase."""
+        return 2 * np.lcm.reduce(self.period, axis=1) + self.phase.max(axis=1)
+
+
+#####
+# Vectorized LET help functions
+#####
+
+
+def let_re(packed, rows, idx, numbers):
+    """Read-events of jobs (numbers) of tasks (idx) of chains (rows)."""
+    return packed.phase[rows, idx] + packed.period[rows, idx] * numbers
+
+
+def let_we(packed, rows, idx, numbers):
+    """Write-events of jobs (numbers) of tasks (idx) of chains (rows)."""
+    return let_re(packed, rows, idx, numbers) + packed.dl[rows, idx]
+
+
+def let_re_geq(packed, rows, idx, times):
+    """Numbers of earliest jobs with read-event at or after (times). (Not smaller than 0.)"""
+    return np.maximum(
+        -((packed.phase[rows, idx] - times) // packed.period[rows, idx]), 0
+    )
+
+
+def let_re_gt(packed, rows, idx, times):
+    """Numbers of earliest jobs with read-event after (times). (Not smaller than 0.)"""
+    return np.maximum(
+        (times - packed.phase[rows, idx]) // packed.period[rows, idx] + 1, 0
+    )
+
+
+def let_we_leq(packed, rows, idx, times):
+    """Numbers of latest jobs with write-event at or before (times)."""
+    return (
+        times - packed.phase[rows, idx] - packed.dl[rows, idx]
+    ) // packed.period[rows, idx]
+
+
+#####
+# Job chains
+#####
+
+
+def fw_numbers(packed, numbers):
+    """Job numbers of the immediate forward job chains of all chains, starting with jobs (numbers) of the first tasks.
+    Returns a 2-D array; entries after the last task are not set."""
+    rows = packed.rows
+    result = np.zeros_like(packed.period)
+    result[:, 0] = numbers
+    for idx in range(1, packed.period.shape[1]):
+        active = idx <= packed.last
+        nxt = let_re_geq(packed, rows, idx, let_we(packed, rows, idx - 1, result[:, idx - 1]))
+        result[:, idx] = np.where(active, nxt, 0)
+    return result
+
+
+def bw_first_numbers(packed, rows, start, numbers):
+    """Numbers of the first jobs of the immediate backward job chains, starting with jobs (numbers) of tasks (start)."""
+    cur = numbers
+    for step in range(1, packed.period.shape[1]):
+        idx = start - step
+        active = idx >= 0
+        if not active.any():
+            break
+        idx = np.maximum(idx, 0)
+        prev = let_we_leq(packed, rows, idx, let_re(packed, rows, idx + 1, cur))
+        cur = np.where(active, prev, cur)
+    return cur
+
+
+def fw_last_numbers(packed, rows, start, numbers):
+    """Numbers of the last jobs of the immediate forward job chains, starting with jobs (numbers) of tasks (start)."""
+    cur = numbers
+    for step in range(1, packed.period.shape[1]):
+        idx = start + step
+        active = idx <= packed.last[rows]
+        if not active.any():
+            break
+        idx = np.minimum(idx, packed.last[rows])
+        nxt = let_re_geq(packed, rows, idx, let_we(packed, rows, idx - 1, cur))
+        cur = np.where(active, nxt, cur)
+    return cur
+
+
+def find_fi(packed):
+    """F_i values of all chains as 2-D array (entries after the last task are not set)."""
+    rows = packed.rows
+    zeros = np.zeros(len(packed), dtype=np.int64)
+    F = fw_last_numbers(packed, rows, zeros, zeros)
+
+    Fi = np.zeros_like(packed.period)
+    Fi[rows, packed.last] = F
+    cur = F
+    for step in range(1, packed.period.shape[1]):
+        idx = packed.last - step
+        active = idx >= 0
+        if not active.any():
+            break
+        idx = np.maximum(idx, 0)
+        prev = let_we_leq(packed, rows, idx, let_re(packed, rows, idx + 1, cur))
+        cur = np.where(active, prev, cur)
+        Fi[rows, idx] = np.where(active, cur, Fi[rows, idx])
+    return Fi
+
+
+#####
+# Batched analysis
+#####
+
+
+def _e2e_group(packed):
+    """MRT (= MDA) of all chains of one group."""
+    rows = packed.rows
+    Fi = find_fi(packed)
+    assert np.all(Fi[:, 0] >= 0)
+    analysis_end = packed.analysis_window()
+
+    # number of partitioned job chains for each point of partitioning (see count_part_chains in analysis.py)
+    zeros = np.zeros(len(packed), dtype=np.int64)
+    last_numbers = fw_numbers(packed, let_re_gt(packed, rows, zeros, analysis_end))
+    counts = last_numbers - Fi
+
+    # plan partitioning (see partition.PartitionPlan); padding is never chosen
+    parts = np.arange(packed.period.shape[1])
+    costs = counts * partition.PartitionPlan.cost_per_chain(
+        packed.lengths[:, None], parts[None, :]
+    )
+    costs = np.where(parts[None, :] <= packed.last[:, None], costs, np.inf)
+    part = costs.argmin(axis=1)
+    count = counts[rows, part]
+    assert np.all(count > 0)
+
+    # all partitioned job chains of all chains, flattened
+    offsets = np.cumsum(count) - count
+    chain_idx = np.repeat(rows, count)
+    numbers = Fi[chain_idx, part[chain_idx]] + np.arange(count.sum()) - offsets[chain_idx]
+    part_idx = part[chain_idx]
+
+    first = bw_first_numbers(packed, chain_idx, part_idx, numbers)
+    last = fw_last_numbers(packed, chain_idx, part_idx, numbers + 1)
+    lengths = let_we(packed, chain_idx, packed.last[chain_idx], last) - let_re(
+        packed, chain_idx, np.zeros_like(chain_idx), first
+    )
+
+    return np.maximum.reduceat(lengths, offsets)
+
+
+def _groups(packed):
+    """Indices of chains, grouped by similar window length.
+    Each group has at most MAX_GROUP_CHAINS partitioned job chains (estimated by window / max period)."""
+    estimate = packed.analysis_window() // packed.period.max(axis=1) + 1
+    order = np.argsort(estimate, kind="stable")
+    group, size = [], 0
+    for idx in order:
+        if group and size + estimate[idx] > MAX_GROUP_CHAINS:
+            yield group
+            group, size = [], 0
+        group.append(idx)
+        size += estimate[idx]
+    if group:
+        yield group
+
+
+def our_batch(chains) -> dict:
+    """Return MDA, MRDA, MRT, and MRRT results of our analysis for many chains as arrays (in the order of chains).
+    (Stage 2 of __main__.py times our_all() per chain; for one dictionary per chain see
+    analysis.our_e2e_tables_all().)"""
+    packed = PackedChains(chains)
+    e2e = np.zeros(len(chains), dtype=np.int64)
+    for group in _groups(packed):
+        e2e[group] = _e2e_group(PackedChains([chains[idx] for idx in group]))
+
+    first_periods = packed.period[:, 0]
+    last_periods = packed.period[packed.rows, packed.last]
+    return {
+        "mda": e2e,
+        "mrda": e2e - last_periods,
+        "mrt": e2e,
+        "mrrt": e2e - first_periods,
+    }
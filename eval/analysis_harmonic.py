@@ -0,0 +1,139 @@
+"""Analysis of harmonic cause-effect chains.
+A chain is harmonic if each period divides all larger periods (e.g., 10, 20, 100, 200, 1000 from the WATERS benchmark).
+Then the hyperperiod is the maximal period H, and all job chains repeat after H up to a shift by H.
+Hence, a window of one maximal period replaces the analysis window of two hyperperiods plus the maximal phase:
+- our analysis: one partitioned job chain with partitioning at a task with period H
+- other analysis: the augmented job chains of H / period of the first (last) task consecutive jobs
+The kernels only use integer arithmetic on the job numbers (no jobs or job chains are constructed).
+Assumptions:
+- LET or implicit communication (see communication.py)
+- periodic
+- integral periods, phases and times from read- to write-event"""
+import communication
+from cechain import CEChain
+
+
+#####
+# Harmonic chains
+#####
+
+
+def int_params(chain: CEChain):
+    """Periods, read phases and write phases of the tasks of (chain) as three lists of ints.
+    None if not all of them are integral."""
+    values = [(comm.period, comm.read_phase, comm.write_phase) for comm in communication.policy_table(chain)]
+    if not all(val is not None and float(val).is_integer() for vals in values for val in vals):
+        return None
+    return tuple([int(val) for val in column] for column in zip(*values))
+
+
+def harmonic_params(chain: CEChain):
+    """Integral parameters of (chain) as in int_params(), if the chain is harmonic. None otherwise."""
+    params = int_params(chain)
+    if params is None:
+        return None
+    periods = sorted(set(params[0]))
+    if any(larger % smaller for smaller, larger in zip(periods, periods[1:])):
+        return None
+    return params
+
+
+def is_harmonic(chain: CEChain) -> bool:
+    """True if the periods of (chain) are integral and each period divides all larger periods."""
+    return harmonic_params(chain) is not None
+
+
+#####
+# Integer kernels
+#####
+
+
+def _forward(params, start, stop, number):
+    """Number of the last job in the immediate forward job chain from job (number) of task (start) to task (stop - 1).
+    (Not smaller than 0, as let_re_geq in analysis.py.)"""
+    periods, read_phases, write_phases = params
+    for idx in range(start + 1, stop):
+        write = write_phases[idx - 1] + periods[idx - 1] * number
+        number = max(-((read_phases[idx] - write) // periods[idx]), 0)
+    return number
+
+
+def _backward(params, start, stop, number):
+    """Number of the first job in the immediate backward job chain from job (number) of task (stop - 1) to task (start).
+    """
+    periods, read_phases, write_phases = params
+    for idx in range(stop - 2, start - 1, -1):
+        read = read_phases[idx + 1] + periods[idx + 1] * number
+        number = (read - write_phases[idx]) // periods[idx]
+    return number
+
+
+def _fi(params, idx):
+    """F_i value of task (idx) (see find_fi in analysis.py)."""
+    length = len(params[0])
+    return _backward(params, idx, length, _forward(params, 0, length, 0))
+
+
+#####
+# Analyses
+#####
+
+
+def harmonic_e2e(chain: CEChain, params=None) -> int:
+    """Compute MRT or MDA (as our_e2e in analysis.py) of a harmonic chain.
+    The partitioned job chains with partitioning at a task with the maximal period coincide up to a shift by the
+    hyperperiod, hence the first complete one gives the result.
+    - params = harmonic_params(chain) (computed if not given)"""
+    if params is None:
+        params = harmonic_params(chain)
+    periods, read_phases, write_phases = params
+    length = len(periods)
+
+    part = periods.index(max(periods))
+    number = _fi(params, part)
+    first = _backward(params, 0, part + 1, number)
+    assert first >= 0
+    last = _forward(params, part, length, number + 1)
+    return write_phases[-1] + periods[-1] * last - (read_phases[0] + periods[0] * first)
+
+
+def harmonic_mrt(chain: CEChain, add_mrrt=False, params=None):
+    """Compute MRT (as other_mrt in analysis.py) of a harmonic chain from the immediate forward augmented job chains
+    of the jobs F_1, ..., F_1 + H / period - 1 of the first task.
+    - params = harmonic_params(chain) (computed if not given)"""
+    if params is None:
+        params = harmonic_params(chain)
+    periods, read_phases, write_phases = params
+    length = len(periods)
+
+    start = _fi(params, 0)
+    mrt = max(
+        write_phases[-1] + periods[-1] * _forward(params, 0, length, number + 1)  # actuation
+        - (read_phases[0] + periods[0] * number)  # external activity
+        for number in range(start, start + max(periods) // periods[0])
+    )
+
+    if add_mrrt:  # the reduced length excludes one period of the first task
+        return mrt, mrt - periods[0]
+    return mrt
+
+
+def harmonic_mda(chain: CEChain, add_mrda=False, params=None):
+    """Compute MDA (as other_mda in analysis.py) of a harmonic chain from the immediate backward augmented job chains
+    of the jobs F_E + 1, ..., F_E + H / period of the last task (all of them are complete).
+    - params = harmonic_params(chain) (computed if not given)"""
+    if params is None:
+        params = harmonic_params(chain)
+    periods, read_phases, write_phases = params
+    length = len(periods)
+
+    start = _fi(params, length - 1) + 1
+    mda = 0
+    for number in range(start, start + max(periods) // periods[-1]):
+        first = _backward(params, 0, length, number - 1)
+        assert first >= 0
+        mda = max(mda, write_phases[-1] + periods[-1] * number - (read_phases[0] + periods[0] * first))
+
+    if add_mrda:  # the reduced length excludes one period of the last task
+        return mda, mda - periods[-1]
+    return mda
@@ -0,0 +1,139 @@
+"""Analysis of sporadic cause-effect chains.
+Upper bounds on MRT, MRRT, MDA, and MRDA in closed form, without constructing job chains or release sequences.
+Assumptions:
+- LET or implicit communication (see communication.py)
+- sporadic (periodic tasks are sporadic with miniat = maxiat = period)
+
+The length of a job chain is the time from read- to write-event of all its jobs plus the waiting times between them:
+- forward: from a write-event to the next read-event of the next task, at most the maxiat of the next task
+- backward: from the latest write-event before a read-event of the next task to it, at most the maxiat of the task
+For segments of periodic tasks with phases, the tighter waiting times of analysis.py are used."""
+import math
+import timeit
+
+import analysis
+import communication
+from cechain import CEChain
+
+
+#####
+# Waiting times
+#####
+
+
+def _maxiat(comm):
+    """Maximum inter-arrival time of the task of a communication backend. (math.inf if not bounded)"""
+    maxiat = comm.task.rel.maxiat
+    return math.inf if maxiat is None else maxiat
+
+
+def _periodic(comm):
+    """True if the task of a communication backend is periodic with given phase."""
+    return comm.period is not None and comm.read_phase is not None
+
+
+def fw_wait_bound(comm, next_comm):
+    """Upper bound on the time from a write-event of a task to the earliest read-event of the next task at or after it.
+    """
+    if _periodic(comm) and _periodic(next_comm):
+        return analysis.let_fw_wait_bound(comm, next_comm)
+    return _maxiat(next_comm)
+
+
+def bw_wait_bound(comm, next_comm):
+    """Upper bound on the time from the latest write-event of a task at or before a read-event of the next task to it.
+    """
+    if _periodic(comm) and _periodic(next_comm):
+        return analysis.let_bw_wait_bound(comm, next_comm)
+    return _maxiat(comm)
+
+
+#####
+# Upper bounds
+#####
+
+
+def _read_to_write(comms):
+    """Sum of the times from read- to write-event of one job of each task."""
+    return sum(comm.write_offset - comm.read_offset for comm in comms)
+
+
+def mrrt_bound(chain: CEChain):
+    """Upper bound on the length of immediate forward job chains (and hence the MRRT)."""
+    comms = communication.policy_table(chain)
+    return _read_to_write(comms) + sum(
+        fw_wait_bound(comms[idx], comms[idx + 1]) for idx in range(len(chain) - 1)
+    )
+
+
+def mrda_bound(chain: CEChain):
+    """Upper bound on the length of immediate backward job chains (and hence the MRDA)."""
+    comms = communication.policy_table(chain)
+    return _read_to_write(comms) + sum(
+        bw_wait_bound(comms[idx], comms[idx + 1]) for idx in range(len(chain) - 1)
+    )
+
+
+def mrt_bound(chain: CEChain, mrrt: float = None):
+    """Upper bound on the MRT: the external activity happens at most maxiat of chain[0] before the next read-event."""
+    if mrrt is None:
+        mrrt = mrrt_bound(chain)
+    return _maxiat(communication.policy_table(chain)[0]) + mrrt
+
+
+def mda_bound(chain: CEChain, mrda: float = None):
+    """Upper bound on the MDA: the next actuation happens at most maxiat of chain[-1] after the last write-event."""
+    if mrda is None:
+        mrda = mrda_bound(chain)
+    return _maxiat(communication.policy_table(chain)[-1]) + mrda
+
+
+#####
+# For the evaluation:
+#####
+
+
+def sporadic_all(ce, repeat=10):
+    """Return list of MDA, MRDA, MRT, and MRRT upper bounds for sporadic chains, plus a timer value."""
+
+    def analyses(ce):
+        res_mrda = mrda_bound(ce)
+        res_mrrt = mrrt_bound(ce)
+        return {
+            "mda": mda_bound(ce, res_mrda),
+            "mrda": res_mrda,
+            "mrt": mrt_bound(ce, res_mrrt),
+            "mrrt": res_mrrt,
+        }
+
+    # sporadic analysis
+    result = analyses(ce)
+
+    # timing
+    result["time"] = min(timeit.repeat(lambda: analyses(ce), repeat=repeat, number=1))
+
+    return result
+
+
+if __name__ == "__main__":
+    """Debug"""
+    import benchmark_WATERS as bw
+    import task
+
+    # periodic chain: bounds are at least the exact values
+    ce = None
+    while ce is None:
+        ts = bw.gen_taskset(0.7)
+        ce = bw.gen_ce_chain(ts)
+    for tsk in ts:
+        tsk.rel.phase = 0
+    print("exact:", analysis.our_all(ce, repeat=1))
+    print("bound:", sporadic_all(ce, repeat=1))
+
+    # sporadic chain: maxiat = 1.5 * period
+    for tsk in ts:
+        tsk.rel = task.Sporadic(maxiat=1.5 * tsk.rel.period, miniat=tsk.rel.period)
+    ce = CEChain(*ce, base_ts=ts)  # new chain, the policy table of the old one is cached
+    print("sporadic bound:", sporadic_all(ce, repeat=1))
+
+    breakpoint()
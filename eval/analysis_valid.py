@@ -1,44 +1,86 @@
 """Analysis applied in the evaluation.
 Assumptions:
-- LET
+- LET or implicit communication (see communication.py)
 - periodic
 This is for the definition of MRT and MDA based on valid chains."""
 import itertools
-import math
 from cechain import CEChain
+from taskset import TaskSetView
 import timeit
+import sys
+import communication
+import counters
+import helpers
+import partition
+import profiling
+import result_cache
 
 
 #####
-# Help functions for LET communication
+# Help functions for communication
+# (the jobs read and write as given by the communication backends of their tasks, see communication.py)
 #####
 
 
 def let_we(job):
-    """Write-event of job under LET."""
-    return job.task.rel.phase + job.task.rel.period * job.number + job.task.dl.dl
+    """Write-event of job under the communication policy of its task."""
+    return job.comm.write_phase + job.comm.period * job.number
 
 
 def let_re(job):
-    """Read-event of job under LET."""
-    return job.task.rel.phase + job.task.rel.period * job.number
+    """Read-event of job under the communication policy of its task."""
+    return job.comm.read_phase + job.comm.period * job.number
 
 
-def let_re_geq(time, task):
-    """Number of earliest job with read-event of (task) at or after (time)."""
-    return math.ceil((time - task.rel.phase) / task.rel.period)  # TODO int()
+def let_re_geq(time, comm):
+    """Number of earliest job with read-event at or after (time), for the task with communication backend (comm)."""
+    return int(-((comm.read_phase - time) // comm.period))
 
 
-def let_re_gt(time, task):
-    """Number of earliest job with read-event of (task) after (time)."""
-    return math.floor((time - task.rel.phase) / task.rel.period) + 1  # TODO int()
+def let_re_gt(time, comm):
+    """Number of earliest job with read-event after (time), for the task with communication backend (comm)."""
+    return int((time - comm.read_phase) // comm.period) + 1
 
 
-def let_we_leq(time, task):
-    """Number of latest job with write-event of (task) at or before (time)."""
-    return math.floor(
-        (time - task.rel.phase - task.dl.dl) / task.rel.period
-    )  # TODO int()
+def let_we_leq(time, comm):
+    """Number of latest job with write-event at or before (time), for the task with communication backend (comm)."""
+    return int((time - comm.write_phase) // comm.period)
+
+
+#####
+# Analysis window
+#####
+
+
+def analysis_window(chain: CEChain):
+    """End of the analysis interval: two hyperperiods plus the maximal phase."""
+    return 2 * chain.hyperperiod() + chain.max_phase()
+
+
+#####
+# Validity threshold
+#####
+
+# first valid job numbers, cached per chain (invalidated with the policy tables)
+_first_valid_numbers = communication.derived_cache()
+
+
+def max_first_read_event(chain: CEChain):
+    """Maximal first read-event of the tasks in the chain.
+    (The first read-event of a task is its phase plus the read offset of its communication policy.)"""
+    return max(comm.read_phase for comm in communication.policy_table(chain))
+
+
+def first_valid_number(chain: CEChain) -> int:
+    """Number of the earliest job of chain[0] such that job chains starting with it are valid,
+    i.e., the next job of chain[0] reads after the maximal first read-event.
+    Valid job chains are also complete, since the number is non-negative.
+    Cached per chain until the policy table of the chain is invalidated (see communication.invalidate())."""
+    if chain not in _first_valid_numbers:
+        _first_valid_numbers[chain] = (
+            let_re_gt(max_first_read_event(chain), communication.policy_table(chain)[0]) - 1
+        )
+    return _first_valid_numbers[chain]
 
 
 #####
@@ -47,11 +89,13 @@ def let_we_leq(time, task):
 class Job:
     """A job."""
 
-    def __init__(self, task=None, number=None):
+    def __init__(self, task, number, comm):
         """Create (number)-th job of a task (task).
+        - comm = communication backend of the task (from the policy table of the chain, see communication.py)
         Assumption: number starts at 0. (0=first job)"""
         self.task = task
         self.number = number
+        self.comm = comm
 
     def __str__(self):
         return f"({self.task}, {self.number})"
@@ -75,24 +119,36 @@ class JobChain(list):
 class FwJobChain(JobChain):
     """Immediate forward job chain."""
 
-    def __init__(self, ce_chain, number):
-        """Create (number)-th immediate forward job chain. (under LET)"""
+    def __init__(self, ce_chain, number, comms=None):
+        """Create (number)-th immediate forward job chain.
+        - ce_chain = cause-effect chain or view of it (see TaskSet.view())
+        - comms = policy table of the (viewed) chain (see communication.policy_table())
+        The jobs are constructed from the backends only, i.e., ce_chain is neither sliced nor iterated."""
         self.number = number  # number of forward job chain
 
-        if len(ce_chain) == 0:
+        if isinstance(ce_chain, TaskSetView):
+            start, stop = ce_chain.start, ce_chain.stop
+            ce_chain = ce_chain.taskset
+        else:
+            start, stop = 0, None
+        if comms is None:
+            comms = communication.policy_table(ce_chain)
+        if stop is None:
+            stop = len(comms)
+
+        if stop == start:
             super().__init__()
             return
 
         # first job
-        job_lst = [Job(ce_chain[0], number)]
+        job_lst = [None] * (stop - start)
+        job = job_lst[0] = Job(comms[start].task, number, comms[start])
 
         # next jobs
-        for tsk in ce_chain[1:]:
+        for idx in range(start + 1, stop):
+            comm = comms[idx]
             # find next job
-            next_job_number = let_re_geq(let_we(job_lst[-1]), tsk)
-
-            # add job to chain
-            job_lst.append(Job(tsk, next_job_number))
+            job = job_lst[idx - start] = Job(comm.task, let_re_geq(let_we(job), comm), comm)
 
         # Make job chain
         super().__init__(*job_lst)
@@ -101,24 +157,36 @@ class FwJobChain(JobChain):
 class BwJobChain(JobChain):
     """Immediate backward job chain."""
 
-    def __init__(self, ce_chain, number):
-        """Create (number)-th immediate backward job chain. (under LET)"""
+    def __init__(self, ce_chain, number, comms=None):
+        """Create (number)-th immediate backward job chain.
+        - ce_chain = cause-effect chain or view of it (see TaskSet.view())
+        - comms = policy table of the (viewed) chain (see communication.policy_table())
+        The jobs are filled in reverse into a preallocated list."""
         self.number = number  # number of backward job chain
 
-        if len(ce_chain) == 0:
+        if isinstance(ce_chain, TaskSetView):
+            start, stop = ce_chain.start, ce_chain.stop
+            ce_chain = ce_chain.taskset
+        else:
+            start, stop = 0, None
+        if comms is None:
+            comms = communication.policy_table(ce_chain)
+        if stop is None:
+            stop = len(comms)
+
+        if stop == start:
             super().__init__()
             return
 
         # last job
-        job_lst = [Job(ce_chain[-1], number)]
+        job_lst = [None] * (stop - start)
+        job = job_lst[-1] = Job(comms[stop - 1].task, number, comms[stop - 1])
 
-        # previous jobs jobs
-        for tsk in ce_chain[0:-1][::-1]:  # backwards except the last
+        # previous jobs
+        for idx in range(stop - 2, start - 1, -1):
+            comm = comms[idx]
             # find previous job
-            previous_job_number = let_we_leq(let_re(job_lst[0]), tsk)
-
-            # add job to chain
-            job_lst.insert(0, Job(tsk, previous_job_number))
+            job = job_lst[idx - start] = Job(comm.task, let_we_leq(let_re(job), comm), comm)
 
         # Make job chain
         super().__init__(*job_lst)
@@ -159,14 +227,12 @@ class AugmJobChain:
     def valid(self):
         """Returns True if augmented job chain is valid."""
         ce_chain = self.base_ce_chain
-        # maximal first read-event
-        max_first_re = max(let_re(Job(tsk, 0)) for tsk in ce_chain)
 
         # number of external activity
-        number_ext_act = let_re_geq(self.ext_act, ce_chain[0])
+        number_ext_act = let_re_geq(self.ext_act, communication.policy_table(ce_chain)[0])
 
         # check valid condition
-        return let_re(Job(ce_chain[0], number_ext_act + 1)) > max_first_re
+        return number_ext_act >= first_valid_number(ce_chain)
 
 
 class FwAugmJobChain(AugmJobChain):
@@ -174,8 +240,9 @@ class FwAugmJobChain(AugmJobChain):
 
     def __init__(self, ce_chain, number):
         """Create the (number)-th immediate forward augmented job chain."""
-        ext_act = let_re(Job(ce_chain[0], number))
-        job_chain = FwJobChain(ce_chain, number + 1)
+        comms = communication.policy_table(ce_chain)
+        ext_act = let_re(Job(ce_chain[0], number, comms[0]))
+        job_chain = FwJobChain(ce_chain, number + 1, comms)
         actuation = let_we(job_chain[-1])
 
         super().__init__(ext_act, job_chain, actuation, base_ce_chain=ce_chain)
@@ -186,8 +253,9 @@ class BwAugmJobChain(AugmJobChain):
 
     def __init__(self, ce_chain, number):
         """Create the (number)-th immediate backward augmented job chain."""
-        actuation = let_we(Job(ce_chain[-1], number))
-        job_chain = BwJobChain(ce_chain, number - 1)
+        comms = communication.policy_table(ce_chain)
+        actuation = let_we(Job(ce_chain[-1], number, comms[-1]))
+        job_chain = BwJobChain(ce_chain, number - 1, comms)
         ext_act = let_re(job_chain[0])
 
         super().__init__(ext_act, job_chain, actuation, base_ce_chain=ce_chain)
@@ -198,51 +266,48 @@ class BwAugmJobChain(AugmJobChain):
 def other_mrt(chain, add_mrrt=False):
     """Method to compute MRT by looking at all valid immediate forward augmented job chains."""
     # find analysis interval
-    analysis_end = 2 * chain.hyperperiod() + chain.max_phase()
-
-    # construct forward chains
-    fw_augm_jcs = []
-    for number in itertools.count(start=0):
-        fw = FwAugmJobChain(chain, number)
-        if fw.ext_act <= analysis_end:
-            fw_augm_jcs.append(fw)
-        else:
-            break
+    analysis_end = analysis_window(chain)
+
+    # construct valid forward chains (lazily)
+    # the (number)-th chain is valid iff number >= first_valid_number(chain)
+    fw_augm_jcs = itertools.takewhile(
+        lambda fac: fac.ext_act <= analysis_end,
+        (
+            FwAugmJobChain(chain, number)
+            for number in itertools.count(start=first_valid_number(chain))
+        ),
+    )
 
     if add_mrrt:  # return tuple of mrt and mrrt
-        return (
-            max([fac.ell() for fac in fw_augm_jcs if fac.valid()]),  # mrt
-            max([fac.ellstar() for fac in fw_augm_jcs if fac.valid()]),
-        )  # mrrt
+        return helpers.running_max(
+            fw_augm_jcs, [AugmJobChain.ell, AugmJobChain.ellstar]  # mrt, mrrt
+        )
     else:  # return only mrt
-        return max([fac.ell() for fac in fw_augm_jcs if fac.valid()])  # mrt
+        return helpers.running_max(fw_augm_jcs, [AugmJobChain.ell])[0]
 
 
 def other_mda(chain, add_mrda=False):
     """Method to compute MDA by looking at all valid, complete immediate backward augmented job chains."""
     # find analysis interval
-    analysis_end = 2 * chain.hyperperiod() + chain.max_phase()
-
-    # construct backward chains
-    bw_augm_jcs = []
-    for number in itertools.count(start=0):
-        bw = BwAugmJobChain(chain, number)
-        if bw.ext_act <= analysis_end:
-            bw_augm_jcs.append(bw)
-        else:
-            break
+    analysis_end = analysis_window(chain)
+
+    # construct valid, complete backward chains (lazily)
+    # valid and complete iff the first job number is at least first_valid_number(chain)
+    v = first_valid_number(chain)
+    bw_augm_jcs = filter(
+        lambda bac: bac.job_chain[0].number >= v,
+        itertools.takewhile(
+            lambda bac: bac.ext_act <= analysis_end,
+            (BwAugmJobChain(chain, number) for number in itertools.count(start=0)),
+        ),
+    )
 
     if add_mrda:  # return tuple of mda and mrda
-        return (
-            max(
-                [bac.ell() for bac in bw_augm_jcs if bac.complete and bac.valid()]
-            ),  # mda
-            max([bac.ellstar() for bac in bw_augm_jcs if bac.complete and bac.valid()]),
-        )  # mrda
-    else:  # return only mrt
-        return max(
-            [bac.ell() for bac in bw_augm_jcs if bac.complete and bac.valid()]
-        )  # mda
+        return helpers.running_max(
+            bw_augm_jcs, [AugmJobChain.ell, AugmJobChain.ellstar]  # mda, mrda
+        )
+    else:  # return only mda
+        return helpers.running_max(bw_augm_jcs, [AugmJobChain.ell])[0]
 
 
 #####
@@ -257,8 +322,9 @@ class PartitionedJobChain:
         - chain = cause-effect chain
         - number = which chain"""
         assert 0 <= part < len(chain), "part is out of possible interval"
-        self.bw = BwJobChain(chain[: part + 1], number)
-        self.fw = FwJobChain(chain[part:], number + 1)  # forward job chain part
+        comms = communication.policy_table(chain)
+        self.bw = BwJobChain(chain.view(0, part + 1), number, comms)  # backward job chain part
+        self.fw = FwJobChain(chain.view(part), number + 1, comms)  # forward job chain part
         self.complete = self.bw.complete  # complete iff bw chain complete
         self.base_ce_chain = chain
 
@@ -272,15 +338,23 @@ class PartitionedJobChain:
 
     def valid(self):
         """Returns true if the partitioned job chain is valid."""
-        ce_chain = self.base_ce_chain
-        # maximal first read-event
-        max_first_re = max(let_re(Job(tsk, 0)) for tsk in ce_chain)
+        return self.bw[0].number >= first_valid_number(self.base_ce_chain)
 
-        # number first job
-        number_first_job = self.bw[0].number
 
-        # check valid condition
-        return let_re(Job(ce_chain[0], number_first_job + 1)) > max_first_re
+def count_part_chains(chain: CEChain, first_numbers: list[int], analysis_end) -> list[int]:
+    """Number of partitioned job chains in the analysis interval, for each point of partitioning.
+    - first_numbers = job numbers of the first backward job chain bc_F
+    The chains with partitioning at (part) end before the job of chain[part] in the immediate forward job chain of
+    the first job of chain[0] with read-event after the analysis interval."""
+    fc = FwJobChain(chain, let_re_gt(analysis_end, communication.policy_table(chain)[0]))
+    return [job.number - first for job, first in zip(fc, first_numbers)]
+
+
+def plan_partition(chain: CEChain, first_numbers: list[int], analysis_end) -> partition.PartitionPlan:
+    """Point of partitioning with the least work over the analysis interval."""
+    return partition.PartitionPlan(
+        chain, count_part_chains(chain, first_numbers, analysis_end)
+    )
 
 
 def our_mda(chain: CEChain, v_chain=None) -> float:
@@ -289,38 +363,28 @@ def our_mda(chain: CEChain, v_chain=None) -> float:
     """
     # construct first complete backward chain bc_F
     if v_chain is None:
-        max_first_re = max(
-            let_re(Job(tsk, 0)) for tsk in chain
-        )  # maximal first read-event
-        first_after = let_re_gt(max_first_re, chain[0])
-        assert first_after >= 0
-        if first_after == 0:
-            v_chain = 0
-        else:
-            v_chain = first_after - 1  # number to check valid v
+        v_chain = first_valid_number(chain)  # number to check valid v
     fw0 = FwJobChain(chain, v_chain)  # compute fc_v
     bw_first = BwJobChain(chain, fw0[-1].number)  # compute bc_F
 
     # find analysis interval
-    analysis_end = 2 * chain.hyperperiod() + chain.max_phase()
+    analysis_end = analysis_window(chain)
 
     # choose point for partitioning
-    # for synchronous let just choose the task with highest period
-    periods = [tsk.rel.period for tsk in chain]
-    part = periods.index(max(periods))
-
-    # construct partitioned chains
-    part_chains = []
-    for number in itertools.count(start=bw_first[part].number):
-        pc = PartitionedJobChain(part, chain, number)
-        if let_re(pc.bw[0]) <= analysis_end:
-            part_chains.append(pc)
-        else:
-            break
+    plan = plan_partition(chain, [job.number for job in bw_first], analysis_end)
+    part = plan.part
+
+    # construct partitioned chains (lazily), their number in the analysis interval is known
+    start = bw_first[part].number
+    part_chains = (
+        PartitionedJobChain(part, chain, number)
+        for number in range(start, start + plan.counts[part])
+    )
 
-    assert all(pc.complete for pc in part_chains)
-    assert all(pc.valid() for pc in part_chains)
-    return max([pc.ell() for pc in part_chains])  # check is not necessary anymore now
+    # all partitioned chains are valid and complete:
+    # the first job numbers only increase over the window, and the first one is bw_first[0]
+    assert bw_first[0].number >= first_valid_number(chain)
+    return helpers.running_max(part_chains, [PartitionedJobChain.ell])[0]
 
 
 def our_mrt(chain: CEChain, mda: float = None, v_chain=None) -> float:
@@ -330,15 +394,7 @@ def our_mrt(chain: CEChain, mda: float = None, v_chain=None) -> float:
 
     # find first valid 1-partitioned chain
     if v_chain is None:
-        max_first_re = max(
-            let_re(Job(tsk, 0)) for tsk in chain
-        )  # maximal first read-event
-        first_after = let_re_gt(max_first_re, chain[0])
-        assert first_after >= 0
-        if first_after == 0:
-            v_chain = 0
-        else:
-            v_chain = first_after - 1  # number to check valid v
+        v_chain = first_valid_number(chain)  # number to check valid v
     first_valid = PartitionedJobChain(0, chain, v_chain)
 
     return max(mda, first_valid.ell())
@@ -346,12 +402,12 @@ def our_mrt(chain: CEChain, mda: float = None, v_chain=None) -> float:
 
 def compute_mrrt(chain: CEChain, mrt: float = None) -> float:
     """Compute MRRT using the result from X # TODO add result
-    Assumption: LET communication
+    Assumption: LET or implicit communication (fixed read offset of the first task)
     """
     if mrt is None:  # Compute MRT if not given
         mrt = our_mrt(chain)
 
-    # difference between MRT and MRRT under LET is one period of the first task
+    # difference between MRT and MRRT is one period of the first task
     mrrt = mrt - chain[0].rel.period
 
     return mrrt
@@ -359,12 +415,12 @@ def compute_mrrt(chain: CEChain, mrt: float = None) -> float:
 
 def compute_mrda(chain: CEChain, mda: float = None) -> float:
     """Compute MRDA using the result from X # TODO add result
-    Assumption: LET communication
+    Assumption: LET or implicit communication (fixed write offset of the last task)
     """
     if mda is None:  # Compute MRT if not given
         mda = our_mda(chain)
 
-    # difference between MRT and MRRT under LET is one period of the last task
+    # difference between MDA and MRDA is one period of the last task
     mrda = mda - chain[-1].rel.period
 
     return mrda
@@ -375,23 +431,19 @@ def compute_mrda(chain: CEChain, mda: float = None) -> float:
 #####
 
 
-def our_all(ce, repeat=10):
-    """Return list of MDA, MRDA, MRT, and MRRT results for our analysis, plus a timer value."""
+def our_all(ce, repeat=10, count=False, cache=None, profiler=None):
+    """Return list of MDA, MRDA, MRT, and MRRT results for our analysis, plus a timer value.
+    If count is True, the work done by the analysis is counted as well (see counters.py).
+    If a cache is given, the results are looked up by the chain signature (see result_cache.py), but not the timing.
+    If a profiler is given, the untimed analysis call is profiled (see profiling.py), but not the timing.
+    """
 
-    def analyses(ce):
+    def analyses(ce, mda=our_mda, mrt=our_mrt):
         # compute v_chain once
-        max_first_re = max(
-            let_re(Job(tsk, 0)) for tsk in ce
-        )  # maximal first read-event
-        first_after = let_re_gt(max_first_re, ce[0])
-        assert first_after >= 0
-        if first_after == 0:
-            v_chain = 0
-        else:
-            v_chain = first_after - 1  # number to check valid v
+        v_chain = first_valid_number(ce)  # number to check valid v
 
-        res_our_mda = our_mda(ce, v_chain=v_chain)
-        res_our_mrt = our_mrt(ce, res_our_mda, v_chain=v_chain)
+        res_our_mda = mda(ce, v_chain)
+        res_our_mrt = mrt(ce, res_our_mda, v_chain)
         return {
             "mda": res_our_mda,
             "mrda": compute_mrda(ce, res_our_mda),
@@ -400,20 +452,32 @@ def our_all(ce, repeat=10):
         }
 
     # our analysis
-    result = analyses(ce)
+    result = profiling.runcall(
+        profiler, analyses, ce, result_cache.cached(our_mda, cache), result_cache.cached(our_mrt, cache)
+    )
 
     # timing
     result["time"] = min(timeit.repeat(lambda: analyses(ce), repeat=repeat, number=1))
 
+    # counting (separate from timing)
+    if count:
+        with counters.counting(sys.modules[__name__]) as counter:
+            analyses(ce)
+        result["counters"] = dict(counter)
+
     return result
 
 
-def other_all(ce, repeat=10):
-    """Return list of MDA, MRDA, MRT, and MRRT results for other analysis, plus a timer value."""
+def other_all(ce, repeat=10, count=False, cache=None, profiler=None):
+    """Return list of MDA, MRDA, MRT, and MRRT results for other analysis, plus a timer value.
+    If count is True, the work done by the analysis is counted as well (see counters.py).
+    If a cache is given, the results are looked up by the chain signature (see result_cache.py), but not the timing.
+    If a profiler is given, the untimed analysis call is profiled (see profiling.py), but not the timing.
+    """
 
-    def analyses(ce):
-        res_other_mda_mrda = other_mda(ce, add_mrda=True)
-        res_other_mrt_mrrt = other_mrt(ce, add_mrrt=True)
+    def analyses(ce, mda=other_mda, mrt=other_mrt):
+        res_other_mda_mrda = mda(ce, True)  # add_mrda
+        res_other_mrt_mrrt = mrt(ce, True)  # add_mrrt
         return {
             "mda": res_other_mda_mrda[0],
             "mrda": res_other_mda_mrda[1],
@@ -422,11 +486,19 @@ def other_all(ce, repeat=10):
         }
 
     # other analysis
-    result = analyses(ce)
+    result = profiling.runcall(
+        profiler, analyses, ce, result_cache.cached(other_mda, cache), result_cache.cached(other_mrt, cache)
+    )
 
     # timing
     result["time"] = min(timeit.repeat(lambda: analyses(ce), repeat=repeat, number=1))
 
+    # counting (separate from timing)
+    if count:
+        with counters.counting(sys.modules[__name__]) as counter:
+            analyses(ce)
+        result["counters"] = dict(counter)
+
     return result
 
 
@@ -511,29 +583,13 @@ if __name__ == "__main__":
                 "our:", o_mda, compute_mrda(ce, o_mda), o_mrt, compute_mrrt(ce, o_mrt)
             )
 
-    if debug_switch in [0, 4]:
-        range_number = 1000
-        for id in range(range_number):
-            # test sample
-            ce, _ = make_ce_test()
+    if debug_switch in [0, 4]:  # Compare other and our analysis (see difftest.py)
+        import difftest
 
-            # other analysis
-            res_other = [*other_mda(ce, add_mrda=True), *other_mrt(ce, add_mrrt=True)]
-            # our analysis
-            res_our_mda = our_mda(ce)
-            res_our_mrt = our_mrt(ce, res_our_mda)
-            res_our = [
-                res_our_mda,
-                compute_mrda(ce, res_our_mda),
-                res_our_mrt,
-                compute_mrrt(ce, res_our_mrt),
-            ]
-            # compare values
-            if not all([x == y for x, y in zip(res_other, res_our)]):
-                print("not equal")
-                breakpoint()
-            if (id + 1) % (range_number / 10) == 0:
-                print(id + 1, "already checked")
+        failures = difftest.run(number=1000, pairs=[("valid_other", "valid_our")])
+        difftest.report(failures)
+        if failures:
+            breakpoint()
 
     if debug_switch in [0, 5]:  # Test timing behavior
         import timeit
@@ -263,7 +263,9 @@ def gen_taskset(
             break
 
     # Transform to our taskset model
-    this_taskset = TaskSet(*[task_transormation(tsk) for tsk in this_taskset])
+    this_taskset = TaskSet.from_arrays(
+        period=[tsk['period'] for tsk in this_taskset],
+        wcet=[tsk['execution'] for tsk in this_taskset])  # same tasks as task_transormation()
 
     return this_taskset
 
@@ -279,8 +281,7 @@ def gen_taskset_periods(number_tasks):
     sys_runnable_periods = dist.rvs(size=number_tasks)  # list all periods
 
     # Make taskset
-    this_taskset = TaskSet(
-        *[task_file.Task(task_file.Periodic(period=per), task_file.ImplicitDeadline()) for per in sys_runnable_periods])
+    this_taskset = TaskSet.from_arrays(period=sys_runnable_periods)
 
     return this_taskset
 
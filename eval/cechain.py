@@ -4,6 +4,8 @@ from taskset import TaskSet
 class CEChain(TaskSet):
     """A cause-effect chain."""
 
+    time_scale = 1  # scale of the time base of the tasks (see taskset.transform_exact)
+
     def __init__(self, *args, base_ts=None):
         self.base_ts = base_ts  # base task set (needed for some analyses)
         super().__init__(*args)
@@ -0,0 +1,146 @@
+"""Communication policies for the analyses.
+Each policy is a backend which gives the read- and write-events of the jobs of one task.
+All policies read and write at fixed offsets after the release of each job:
+- LET: read at the release, write at the release plus the deadline
+- implicit: read at the release (earliest start), write at the release plus the WCRT (latest finish)
+The analyses look up the backends in a policy table, which is computed once per chain.
+Hence, job chains of chains with mixed policies are constructed without checking the policy per job.
+The tables are invalidated when the tasks of a task set change (see TaskSet.invalidate in taskset.py)."""
+import weakref
+
+# policy tables, cached per chain
+_policy_tables = weakref.WeakKeyDictionary()
+
+# caches of values derived from the policy tables, per chain (see derived_cache)
+_derived_caches = []
+
+
+class CommunicationBackend:
+    """Read- and write-events of the jobs of a task.
+    For periodic tasks, job (number) reads at read_phase + period * number and writes at write_phase + period * number.
+    For sporadic tasks, only the offsets are defined (period and phases are None)."""
+
+    type = None  # communication policy
+
+    def __init__(self, tsk, read_offset, write_offset):
+        """Create the backend of (tsk).
+        - read_offset, write_offset = read- and write-event relative to the release of each job"""
+        assert read_offset <= write_offset, "Jobs cannot write before they read."
+        self.task = tsk
+        self.read_offset = read_offset
+        self.write_offset = write_offset
+
+        # periodic tasks
+        self.period = getattr(tsk.rel, "period", None)
+        phase = getattr(tsk.rel, "phase", None)
+        self.read_phase = None if phase is None else phase + read_offset  # read-event of the first job
+        self.write_phase = None if phase is None else phase + write_offset  # write-event of the first job
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.period=}, {self.read_phase=}, {self.write_phase=})"
+
+    def re(self, number):
+        """Read-event of job (number)."""
+        return self.read_phase + self.period * number
+
+    def we(self, number):
+        """Write-event of job (number)."""
+        return self.write_phase + self.period * number
+
+    def re_geq(self, time):
+        """Number of earliest job with read-event at or after (time)."""
+        return int(-((self.read_phase - time) // self.period))
+
+    def re_gt(self, time):
+        """Number of earliest job with read-event after (time)."""
+        return int((time - self.read_phase) // self.period) + 1
+
+    def we_leq(self, time):
+        """Number of latest job with write-event at or before (time)."""
+        return int((time - self.write_phase) // self.period)
+
+
+class LET(CommunicationBackend):
+    """Logical execution time: read at the release, write at the deadline."""
+
+    type = "LET"
+
+    def __init__(self, tsk, taskset=None):
+        super().__init__(tsk, 0, tsk.dl.dl)
+
+
+class Implicit(CommunicationBackend):
+    """Implicit communication: read at the start, write at the finish of the job.
+    Upper bounded by reading at the release and writing at the release plus the WCRT."""
+
+    type = "implicit"
+
+    def __init__(self, tsk, taskset=None):
+        if taskset is None:
+            raise ValueError(f"Implicit communication of {tsk} requires the task set to compute the WCRT.")
+        if not hasattr(taskset, "wcrts"):
+            taskset.compute_wcrts()
+        if tsk not in taskset.wcrts:
+            raise ValueError(f"{tsk} is not in the task set {taskset}.")
+        super().__init__(tsk, 0, taskset.wcrts[tsk])
+
+
+# available backends: communication policy -> backend
+BACKENDS = {backend.type: backend for backend in [LET, Implicit]}
+
+
+def policy(tsk):
+    """Communication policy of a task. (LET if the task has no communication feature.)"""
+    return "LET" if tsk.comm is None else tsk.comm.type
+
+
+def backend(tsk, taskset=None) -> CommunicationBackend:
+    """Backend for the communication policy of (tsk).
+    - taskset = task set of tsk, required for implicit communication"""
+    return BACKENDS[policy(tsk)](tsk, taskset)
+
+
+def policy_table(chain) -> list[CommunicationBackend]:
+    """Backends of all tasks of (chain), in the order of the chain. (cached per chain)
+    The WCRTs for implicit communication are computed in the base task set of the chain."""
+    try:
+        return _policy_tables[chain]
+    except KeyError:
+        pass
+    except TypeError:  # no cache for plain lists of tasks
+        return _make_policy_table(chain)
+    table = _policy_tables[chain] = _make_policy_table(chain)
+    return table
+
+
+def derived_cache() -> weakref.WeakKeyDictionary:
+    """New cache of values per chain which are derived from its policy table (e.g., validity thresholds).
+    Its entries are removed together with the policy tables (see invalidate())."""
+    cache = weakref.WeakKeyDictionary()
+    _derived_caches.append(cache)
+    return cache
+
+
+def invalidate(taskset=None):
+    """Remove the cached policy tables and derived values (see derived_cache()) of (taskset), of the chains over it
+    and of all chains with tasks of it. All of them are removed if taskset is None."""
+    caches = [_policy_tables, *_derived_caches]
+    if taskset is None:
+        for cache in caches:
+            cache.clear()
+        return
+    if not any(caches):
+        return
+    tasks = set(taskset)
+    for cache in caches:
+        for chain in list(cache.keys()):
+            if chain is taskset or getattr(chain, "base_ts", None) is taskset or any(tsk in tasks for tsk in chain):
+                cache.pop(chain, None)
+
+
+def _make_policy_table(chain):
+    """Backends of all tasks of (chain)."""
+    taskset = getattr(chain, "base_ts", None)
+    if taskset is None:
+        taskset = chain
+    return [backend(tsk, taskset) for tsk in chain]
@@ -0,0 +1,120 @@
+"""Counters for the work done by the analyses.
+Counting temporarily replaces jobs, job chains and LET help functions of analysis modules by counting versions.
+The fast paths (see e2e_dispatch in analysis.py and analysis_harmonic.py) construct no jobs; their kernel calls and
+the job numbers computed by them are counted instead.
+Hence, disabled counting does not cost anything."""
+import collections
+import contextlib
+import functools
+
+# counted objects of analysis modules
+JOB_CLASSES = ["Job"]
+JOB_CHAIN_CLASSES = [
+    "FwJobChain",
+    "BwJobChain",
+    "FwAugmJobChain",
+    "BwAugmJobChain",
+    "PartitionedJobChain",
+]
+LET_FUNCTIONS = ["let_we", "let_re", "let_re_geq", "let_re_gt", "let_we_leq"]
+# kernels of the fast paths
+KERNEL_FUNCTIONS = ["single_pattern_e2e", "harmonic_e2e", "harmonic_mrt", "harmonic_mda"]
+# job numbers computed by one call: function name -> function of the call arguments
+KERNEL_STEPS = {
+    "single_pattern_e2e": lambda chain: len(chain) - 1,
+    "_forward": lambda params, start, stop, number: max(stop - start - 1, 0),
+    "_backward": lambda params, start, stop, number: max(stop - start - 1, 0),
+}
+# recorded return values: function name -> how to store the return value in the counter
+RECORDED_FUNCTIONS = {
+    "analysis_window": lambda counter, window: counter.__setitem__("window", window),
+    "plan_partition": lambda counter, plan: counter.update(plan.report()),
+}
+
+
+def _counting_class(cls, counter):
+    """Subclass of cls which counts its instances."""
+
+    def __init__(self, *args, **kwargs):
+        counter[cls.__name__] += 1
+        cls.__init__(self, *args, **kwargs)
+
+    return type(cls.__name__, (cls,), {"__init__": __init__})
+
+
+def _counting_function(fct, counter):
+    """Wrapper of fct which counts its calls."""
+
+    @functools.wraps(fct)
+    def wrapper(*args, **kwargs):
+        counter[fct.__name__] += 1
+        return fct(*args, **kwargs)
+
+    return wrapper
+
+
+def _stepping_function(fct, counter, steps):
+    """Wrapper of fct which adds steps(*args, **kwargs) to the kernel steps in counter."""
+
+    @functools.wraps(fct)
+    def wrapper(*args, **kwargs):
+        counter["kernel_steps"] += steps(*args, **kwargs)
+        return fct(*args, **kwargs)
+
+    return wrapper
+
+
+def _recording_function(fct, counter, record):
+    """Wrapper of fct which stores its return values in counter with record(counter, value)."""
+
+    @functools.wraps(fct)
+    def wrapper(*args, **kwargs):
+        result = fct(*args, **kwargs)
+        record(counter, result)
+        return result
+
+    return wrapper
+
+
+@contextlib.contextmanager
+def counting(*modules):
+    """Count jobs, job chains, LET help function calls, kernel calls and the analysis window of analyses in modules.
+    Yields a collections.Counter which is filled while the context is active.
+    The analysis window of the last analyzed chain is stored as 'window',
+    the predicted number of partitioned job chains and work of the partitioning plan as in PartitionPlan.report(),
+    the job numbers computed by the kernels of the fast paths as 'kernel_steps'.
+    On exit, the totals 'jobs', 'job_chains', 'let_calls' and 'kernel_calls' are added."""
+    counter = collections.Counter()
+
+    # (module, name) -> replacement
+    replacements = dict()
+
+    def replace(module, name, wrap):
+        if hasattr(module, name):
+            replacements[module, name] = wrap(replacements.get((module, name), getattr(module, name)))
+
+    for module in modules:
+        for name in JOB_CLASSES + JOB_CHAIN_CLASSES:
+            replace(module, name, lambda cls: _counting_class(cls, counter))
+        for name in LET_FUNCTIONS + KERNEL_FUNCTIONS:
+            replace(module, name, lambda fct: _counting_function(fct, counter))
+        for name, steps in KERNEL_STEPS.items():
+            replace(module, name, lambda fct: _stepping_function(fct, counter, steps))
+        for name, record in RECORDED_FUNCTIONS.items():
+            replace(module, name, lambda fct: _recording_function(fct, counter, record))
+
+    originals = {(module, name): getattr(module, name) for module, name in replacements}
+    try:
+        for (module, name), obj in replacements.items():
+            setattr(module, name, obj)
+        yield counter
+    finally:
+        for (module, name), obj in originals.items():
+            setattr(module, name, obj)
+
+        # totals
+        counter["jobs"] = sum(counter[name] for name in JOB_CLASSES)
+        counter["job_chains"] = sum(counter[name] for name in JOB_CHAIN_CLASSES)
+        counter["let_calls"] = sum(counter[name] for name in LET_FUNCTIONS)
+        counter["kernel_calls"] = sum(counter[name] for name in KERNEL_FUNCTIONS)
+        counter["kernel_steps"] += 0  # (also listed if no kernel was called)
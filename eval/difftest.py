@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""Differential testing of the analyses.
+Random chains are analyzed by a reference and a fast engine, in parallel worker processes.
+Each failing chain (different results or an exception) is shrunk to a smallest failing chain.
+Chains are described by specs, i.e., tuples of tasks (period, phase, deadline) with integers,
+which are picklable, reproducible from a seed, and easy to shrink.
+Additionally, the engines are checked after in-place changes of the phases and TaskSet.invalidate(), i.e., no stale
+cached values (policy tables, validity thresholds) are used.
+Usage: python3 eval/difftest.py -n 1000 -p 4 [--invalidation]"""
+import functools
+import random
+from multiprocessing import Pool
+from optparse import OptionParser
+
+import analysis
+import analysis_batch
+import analysis_valid
+import simulator
+import task
+from cechain import CEChain
+from taskset import TaskSet
+
+PERIODS = [1, 2, 5, 10, 20, 50, 100, 200, 1000]  # periods as in benchmark_WATERS.py
+METRICS = ["mda", "mrda", "mrt", "mrrt"]
+
+
+#####
+# Chain specs
+#####
+
+
+def build_chain(spec) -> CEChain:
+    """Cause-effect chain of LET tasks from (spec)."""
+    tsks = [
+        task.Task(task.Periodic(period=period, phase=phase), task.ArbitraryDeadline(dl=dl))
+        for period, phase, dl in spec
+    ]
+    return CEChain(*tsks, base_ts=TaskSet(*tsks))
+
+
+def random_spec(rng, max_length=15, max_patterns=3):
+    """Random chain spec: up to (max_patterns) periods, (max_length) tasks, phases and arbitrary deadlines."""
+    periods = rng.sample(PERIODS, rng.randint(1, max_patterns))
+    phased = rng.random() < 0.5
+    spec = []
+    for _ in range(rng.randint(1, max_length)):
+        period = rng.choice(periods)
+        phase = rng.randrange(period) if phased else 0
+        dl = rng.choice([period, period, 0, rng.randint(0, 2 * period)])
+        spec.append((period, phase, dl))
+    return tuple(spec)
+
+
+def _size(spec):
+    """Size of a spec for shrinking: number of tasks first, then the values."""
+    return len(spec), sum(sum(tsk) for tsk in spec)
+
+
+def _smaller_values(value, lower=0):
+    """Candidates for a smaller value: lower bound, half, minus one."""
+    return sorted({lower, (value + lower) // 2, value - 1} - {value}) if value > lower else []
+
+
+def _shrink_candidates(spec):
+    """Specs which are a bit smaller than (spec)."""
+    # remove tasks
+    for idx in range(len(spec)):
+        if len(spec) > 1:
+            yield spec[:idx] + spec[idx + 1:]
+
+    # smaller values
+    for idx, (period, phase, dl) in enumerate(spec):
+        candidates = [(period, phase, value) for value in _smaller_values(dl)]
+        candidates += [(period, value, dl) for value in _smaller_values(phase)]
+        candidates += [(value, min(phase, value - 1), dl) for value in _smaller_values(period, lower=1)]
+        candidates += [(value, min(phase, value - 1), dl) for value in PERIODS if value < period]
+        for tsk in candidates:
+            yield spec[:idx] + (tsk,) + spec[idx + 1:]
+
+
+def shrink(spec, fails):
+    """Smallest spec (greedily) for which fails(spec) is still True."""
+    improved = True
+    while improved:
+        improved = False
+        for candidate in sorted(set(_shrink_candidates(spec)), key=_size):
+            if _size(candidate) < _size(spec) and fails(candidate):
+                spec, improved = candidate, True
+                break
+    return spec
+
+
+#####
+# Engines
+#####
+
+
+def _other(ce):
+    mda, mrda = analysis.other_mda(ce, add_mrda=True)
+    mrt, mrrt = analysis.other_mrt(ce, add_mrrt=True)
+    return {"mda": mda, "mrda": mrda, "mrt": mrt, "mrrt": mrrt}
+
+
+def _other_dispatch(ce):
+    mda, mrda = analysis.other_mda_dispatch(ce, add_mrda=True)
+    mrt, mrrt = analysis.other_mrt_dispatch(ce, add_mrrt=True)
+    return {"mda": mda, "mrda": mrda, "mrt": mrt, "mrrt": mrrt}
+
+
+def _valid_other(ce):
+    mda, mrda = analysis_valid.other_mda(ce, add_mrda=True)
+    mrt, mrrt = analysis_valid.other_mrt(ce, add_mrrt=True)
+    return {"mda": mda, "mrda": mrda, "mrt": mrt, "mrrt": mrrt}
+
+
+def _enumerating(ce):
+    e2e = analysis.our_e2e(ce)
+    return {"mda": e2e, "mrda": analysis.compute_mrda(ce, e2e), "mrt": e2e, "mrrt": analysis.compute_mrrt(ce, e2e)}
+
+
+def _batch(ce):
+    result = analysis_batch.our_batch([ce])
+    return {metric: result[metric][0].item() for metric in METRICS}
+
+
+# engines: name -> function(chain) with results as dictionary
+ENGINES = {
+    "other": _other,
+    "our": lambda ce: analysis.our_all(ce, repeat=1, fast=True),  # with the fast paths of e2e_dispatch()
+    "enumerating": _enumerating,
+    "other_dispatch": _other_dispatch,  # harmonic chains in one maximal period
+    "tables": lambda ce: analysis.our_e2e_tables_all([ce])[0],
+    "batch": _batch,
+    "simulator": lambda ce: simulator.simulate(ce, hyperperiods=3),
+    "valid_other": _valid_other,
+    "valid_our": lambda ce: analysis_valid.our_all(ce, repeat=1),
+}
+
+# compared engines: (reference, fast)
+PAIRS = [
+    ("other", "our"),
+    ("enumerating", "our"),
+    ("other", "other_dispatch"),
+    ("other", "tables"),
+    ("other", "batch"),
+    ("other", "simulator"),
+    ("valid_other", "valid_our"),
+]
+
+
+def mismatches(spec, pairs=PAIRS):
+    """Pairs of engines with different results for (spec), as list of (reference, fast, message)."""
+    ce = build_chain(spec)
+    results = dict()
+    for name in {name for pair in pairs for name in pair}:
+        try:
+            results[name] = ENGINES[name](ce)
+        except Exception as exc:
+            results[name] = exc
+
+    found = []
+    for ref, fast in pairs:
+        res_ref, res_fast = results[ref], results[fast]
+        if isinstance(res_ref, Exception) or isinstance(res_fast, Exception):
+            found.append((ref, fast, f"{ref}: {res_ref!r}, {fast}: {res_fast!r}"))
+        elif any(res_ref[metric] != res_fast[metric] for metric in METRICS):
+            diff = {metric: (res_ref[metric], res_fast[metric]) for metric in METRICS}
+            found.append((ref, fast, f"(reference, fast) = {diff}"))
+    return found
+
+
+#####
+# Test runs
+#####
+
+
+def check_seed(seed, pairs=PAIRS):
+    """Check a random spec generated from (seed). Returns (seed, spec, mismatches)."""
+    spec = random_spec(random.Random(seed))
+    return seed, spec, mismatches(spec, pairs)
+
+
+def minimize(spec, ref, fast):
+    """Smallest spec for which the engines (ref) and (fast) still differ."""
+    return shrink(spec, lambda candidate: bool(mismatches(candidate, [(ref, fast)])))
+
+
+def run(number=1000, processes=1, seed=0, pairs=PAIRS, max_failures=1):
+    """Check (number) random specs in (processes) worker processes.
+    Stops after (max_failures) failing specs and returns their minimized counterexamples as list of
+    (seed, reference, fast, minimized spec, message)."""
+    failures = []
+    with Pool(processes) as p:
+        seeds = range(seed, seed + number)
+        for idx, (spec_seed, spec, found) in enumerate(
+            p.imap_unordered(functools.partial(check_seed, pairs=pairs), seeds, chunksize=16)
+        ):
+            for ref, fast, _ in found:
+                small = minimize(spec, ref, fast)
+                message = mismatches(small, [(ref, fast)])[0][2]
+                failures.append((spec_seed, ref, fast, small, message))
+            if len(failures) >= max_failures:
+                p.terminate()
+                break
+            if (idx + 1) % max(number // 10, 1) == 0:
+                print(idx + 1, "already checked")
+    return failures
+
+
+def check_invalidation(seed, engines=None):
+    """Analyze the chain of a random spec from (seed) with all (engines), change its phases in place, invalidate
+    (see TaskSet.invalidate()) and analyze again. The results have to coincide with the ones of a fresh chain.
+    Returns (seed, spec, mismatches) with mismatches as list of (engine, message)."""
+    if engines is None:
+        engines = sorted({name for pair in PAIRS for name in pair})
+    rng = random.Random(seed)
+    spec = random_spec(rng)
+    # synchronous instead of phased releases and vice versa
+    phased = any(phase for _, phase, _ in spec)
+    changed = tuple((period, 0 if phased else rng.randrange(period), dl) for period, phase, dl in spec)
+
+    def results(ce):
+        res = dict()
+        for name in engines:
+            try:
+                res[name] = ENGINES[name](ce)
+            except Exception as exc:
+                res[name] = exc
+        return res
+
+    ce = build_chain(spec)
+    results(ce)  # fill the caches
+    for tsk, (_, phase, _) in zip(ce, changed):
+        tsk.rel.phase = phase
+    ce.base_ts.invalidate()
+    fresh = build_chain(changed)
+    res_invalidated, res_fresh = results(ce), results(fresh)
+
+    found = []
+    # cached values which do not always change the results
+    threshold, fresh_threshold = analysis_valid.first_valid_number(ce), analysis_valid.first_valid_number(fresh)
+    if threshold != fresh_threshold:
+        found.append(("first_valid_number", f"(invalidated, fresh) = {(threshold, fresh_threshold)}"))
+    for name in engines:
+        res_inv, res_new = res_invalidated[name], res_fresh[name]
+        if isinstance(res_inv, Exception) or isinstance(res_new, Exception):
+            if repr(res_inv) != repr(res_new):
+                found.append((name, f"invalidated: {res_inv!r}, fresh: {res_new!r}"))
+        elif any(res_inv[metric] != res_new[metric] for metric in METRICS):
+            diff = {metric: (res_inv[metric], res_new[metric]) for metric in METRICS}
+            found.append((name, f"(invalidated, fresh) = {diff}"))
+    return seed, spec, found
+
+
+def run_invalidation(number=1000, processes=1, seed=0):
+    """Check the invalidation (see check_invalidation()) for (number) random specs.
+    Returns the failures as list of (seed, engine, spec, message)."""
+    failures = []
+    with Pool(processes) as p:
+        for spec_seed, spec, found in p.imap_unordered(check_invalidation, range(seed, seed + number), chunksize=16):
+            failures.extend((spec_seed, name, spec, message) for name, message in found)
+    return failures
+
+
+def report_invalidation(failures):
+    """Print failures of run_invalidation()."""
+    if not failures:
+        print("No stale values after invalidation.")
+    for spec_seed, name, spec, message in failures:
+        print(f"seed {spec_seed}: {name} uses stale values after invalidation")
+        print(f"  build_chain({spec!r})")
+        print(f"  {message}")
+
+
+def report(failures):
+    """Print minimized counterexamples."""
+    if not failures:
+        print("All engines coincide.")
+    for spec_seed, ref, fast, spec, message in failures:
+        print(f"seed {spec_seed}: {ref} != {fast}")
+        print(f"  build_chain({spec!r})")
+        print(f"  {message}")
+
+
+if __name__ == "__main__":
+    parser = OptionParser()
+    parser.add_option("-n", "--number", dest="number", type="int", default=1000,
+                      help="Number of random chains.")
+    parser.add_option("-p", "--processes", dest="processes", type="int", default=1,
+                      help="Number of simultaneous processes.")
+    parser.add_option("--seed", dest="seed", type="int", default=0,
+                      help="Seed of the first random chain.")
+    parser.add_option("--failures", dest="max_failures", type="int", default=1,
+                      help="Stop after FAILURES failing chains.", metavar="FAILURES")
+    parser.add_option("--invalidation", dest="invalidation", action="store_true", default=False,
+                      help="Check the engines after in-place changes and invalidation instead.")
+    (options, args) = parser.parse_args()
+
+    if options.invalidation:
+        report_invalidation(run_invalidation(options.number, options.processes, options.seed))
+    else:
+        report(run(options.number, options.processes, options.seed, max_failures=options.max_failures))
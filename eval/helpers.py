@@ -29,3 +29,37 @@ def load_data(filename):
     file.close()
     print(f'Data loaded from {filename}')
     return data
+
+
+def running_max(iterable, keys, bounds=None):
+    """Maximum of each key function over iterable, computed in one pass.
+    - keys = list of functions, one per metric
+    - bounds = upper bounds of the metrics (optional); stops as soon as all maxima reach their bound
+    Returns a tuple with one maximum per key.
+    Only the current maxima are stored, i.e., memory is independent of the length of iterable."""
+    it = iter(iterable)
+    try:
+        first = next(it)
+    except StopIteration:
+        raise ValueError("running_max() arg is an empty sequence")
+    maxima = [key(first) for key in keys]
+
+    if bounds is None:
+        for item in it:
+            for idx, key in enumerate(keys):
+                val = key(item)
+                if val > maxima[idx]:
+                    maxima[idx] = val
+        return tuple(maxima)
+
+    reached = [m >= b for m, b in zip(maxima, bounds)]
+    while not all(reached):
+        item = next(it, None)
+        if item is None:
+            break
+        for idx, key in enumerate(keys):
+            val = key(item)
+            if val > maxima[idx]:
+                maxima[idx] = val
+                reached[idx] = val >= bounds[idx]
+    return tuple(maxima)
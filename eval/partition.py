@@ -0,0 +1,46 @@
+"""Choice of the point of partitioning for partitioned job chains."""
+
+
+class PartitionPlan:
+    """Point of partitioning with the least predicted work over the analysis interval."""
+
+    # relative cost to construct one partitioned job chain (fitted with debug_switch 7 in analysis.py,
+    # normalized to one job of the forward job chain): a constant part plus one part per job in the backward and in
+    # the forward job chain; backward jobs are cheaper, since let_we_leq() does not clamp at job 0
+    chain_cost = 7.0
+    bw_job_cost = 0.75
+    fw_job_cost = 1.0
+
+    def __init__(self, chain, counts):
+        """Plan the partitioning of (chain).
+        - counts = number of partitioned job chains in the analysis interval for each point of partitioning"""
+        assert len(counts) == len(chain) > 0
+        self.counts = counts
+        self.costs = [
+            count * self.cost_per_chain(len(chain), part)
+            for part, count in enumerate(counts)
+        ]
+        self.part = self.costs.index(min(self.costs))
+
+        # heuristic: task with the highest period
+        periods = [tsk.rel.period for tsk in chain]
+        self.max_period_part = periods.index(max(periods))
+
+    @classmethod
+    def cost_per_chain(cls, length, part):
+        """Cost of one partitioned job chain with partitioning at (part) for a chain of (length) tasks.
+        The backward job chain has part + 1 jobs, the forward job chain has length - part jobs."""
+        return (
+            cls.chain_cost
+            + cls.bw_job_cost * (part + 1)
+            + cls.fw_job_cost * (length - part)
+        )
+
+    def report(self):
+        """Predicted number of chains and work of the plan and of the max-period heuristic."""
+        return {
+            "part_chains_predicted": self.counts[self.part],
+            "part_chains_max_period": self.counts[self.max_period_part],
+            "work_predicted": self.costs[self.part],
+            "work_max_period": self.costs[self.max_period_part],
+        }
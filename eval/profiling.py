@@ -0,0 +1,142 @@
+"""Profiling of the analysis workers.
+Each worker process profiles the untimed analysis call of the wrapped analysis with cProfile (the timing runs without
+profiler) and dumps its stats to one file per process when it exits.
+The files are merged into one aggregated report afterwards.
+Additionally, the imports of the analysis stage are checked (python3 eval/profiling.py [BUDGET]): importing scipy or
+matplotlib fails the check, exceeding the import time budget only gives a warning (timings vary with the load)."""
+import cProfile
+import glob
+import multiprocessing.util
+import os
+import pickle
+import pstats
+import subprocess
+import sys
+import tempfile
+import warnings
+
+# packages which the analysis stage (and its workers) must not import
+HEAVY_PACKAGES = ("scipy", "matplotlib")
+
+# import time budget of the analysis stage in seconds (about 0.2s to 0.4s are measured without scipy and matplotlib,
+# 1.5s with them)
+IMPORT_BUDGET = 1.0
+
+# one profiler per (worker process, wrapped function)
+_profilers = dict()
+
+
+class Profiled:
+    """Wrap an analysis function such that its untimed analysis call is profiled.
+    The function gets the profiler of the current process as keyword argument (profiler), see our_all in analysis.py.
+    Picklable, so it can be passed to the workers of a multiprocessing.Pool."""
+
+    def __init__(self, fct, stats_dir, name=None):
+        """- fct = function to profile (defined at module level)
+        - stats_dir = directory for the per-worker stats files
+        - name = prefix of the stats files"""
+        self.fct = fct
+        self.stats_dir = stats_dir
+        self.name = name if name is not None else fct.__name__
+
+    def stats_file(self):
+        """Stats file of the current worker process."""
+        return os.path.join(self.stats_dir, f"{self.name}_{os.getpid()}.prof")
+
+    def profiler(self):
+        """Profiler of the current worker process. Its stats are dumped once, when the process exits.
+        (Pool workers only run the finalizers if the pool is closed and joined, see workers.run.)"""
+        key = (os.getpid(), self.name)
+        if key not in _profilers:
+            profiler = _profilers[key] = cProfile.Profile()
+            multiprocessing.util.Finalize(None, profiler.dump_stats, args=(self.stats_file(),), exitpriority=10)
+        return _profilers[key]
+
+    def __call__(self, *args, **kwargs):
+        return self.fct(*args, profiler=self.profiler(), **kwargs)
+
+
+def runcall(profiler, fct, *args):
+    """fct(*args), profiled with (profiler) if it is not None."""
+    if profiler is None:
+        return fct(*args)
+    return profiler.runcall(fct, *args)
+
+
+def clear_stats(stats_dir, name):
+    """Remove stats files of a previous run."""
+    for filename in glob.glob(os.path.join(stats_dir, f"{name}_*.prof")):
+        os.remove(filename)
+
+
+def merge_stats(stats_dir, name, report_file, top=30):
+    """Merge the per-worker stats files into one report.
+    The report lists the top functions by cumulative time and by internal time, including call counts.
+    Returns the merged pstats.Stats object."""
+    filenames = sorted(glob.glob(os.path.join(stats_dir, f"{name}_*.prof")))
+    if len(filenames) == 0:
+        raise ValueError(f"No stats files for {name} found in {stats_dir}.")
+
+    with open(report_file, "w") as f:
+        stats = pstats.Stats(*filenames, stream=f)
+        f.write(f"=== {name}: merged from {len(filenames)} worker stats files\n")
+        stats.strip_dirs()
+        stats.sort_stats("cumulative").print_stats(top)
+        stats.sort_stats("tottime").print_stats(top)
+
+    print(f"Profile report {report_file} created")
+    return stats
+
+
+#####
+# Import time
+#####
+
+
+def import_times(args, cwd=None) -> list:
+    """Modules imported by python3 -X importtime (args) as list of (name, cumulative import time in seconds, depth).
+    Depth 0 are the modules imported directly, larger depths are nested imports."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True, cwd=cwd)
+    if proc.returncode != 0:
+        raise RuntimeError(f"{args} failed:\n{proc.stderr}")
+
+    times = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if cumulative.strip().isdigit():
+            depth = (len(name) - len(name.lstrip()) - 1) // 2  # nested modules are indented by two spaces
+            times.append((name.strip(), int(cumulative) / 1e6, depth))
+    return times
+
+
+def check_import_budget(budget=IMPORT_BUDGET, forbidden=HEAVY_PACKAGES) -> float:
+    """Run the analysis stage (python3 eval -s2) for an empty list of chains and check its imports:
+    no module of a (forbidden) package is imported (RuntimeError otherwise), and the total import time is at most
+    (budget) seconds (only a warning otherwise).
+    Returns the total import time in seconds."""
+    eval_dir = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as cwd:
+        os.makedirs(os.path.join(cwd, "output"))
+        with open(os.path.join(cwd, "output", "ces.pickle"), "wb") as f:
+            pickle.dump([], f)
+        times = import_times([eval_dir, "-s2", "-p1"], cwd=cwd)
+
+    loaded = sorted({name.split(".")[0] for name, _, _ in times} & set(forbidden))
+    if loaded:
+        raise RuntimeError(f"The analysis stage imports {loaded}.")
+    direct = [(name, cumulative) for name, cumulative, depth in times if depth == 0]
+    total = sum(cumulative for _, cumulative in direct)
+    if total > budget:
+        slowest = sorted(direct, key=lambda item: item[1], reverse=True)[:5]
+        warnings.warn(f"Import time {total:.3f}s exceeds the budget of {budget}s. Slowest: {slowest}")
+    return total
+
+
+if __name__ == "__main__":
+    """Import-time budget of the analysis stage."""
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else IMPORT_BUDGET
+    total = check_import_budget(budget)
+    print(f"Import time of the analysis stage: {total:.3f}s (budget {budget}s),",
+          f"no import of {', '.join(HEAVY_PACKAGES)}.")
@@ -0,0 +1,244 @@
+"""Persistent cache of analysis results, keyed by the canonical signature of the chain.
+Many generated chains coincide in everything the analyses depend on: the ordered read- and write-events of their
+tasks, i.e., (period, read phase, time from read- to write-event) of each task (period, phase, deadline under LET).
+The results are stored in an SQLite database, which is shared by all worker processes.
+The cache is bounded: the least recently used entries are removed when it grows beyond max_entries.
+Lookups only read the database: the times of use and the hit and miss counts are kept in memory per process and
+written in batches (with the next insert, every FLUSH_INTERVAL lookups, and when the process exits).
+Only the results (correctness pass) are cached; the timing pass always runs the analyses.
+Entries are invalidated when the source files of the analysis module or of the modules it uses change."""
+import collections
+import functools
+import hashlib
+import multiprocessing.util
+import os
+import pickle
+import sqlite3
+import sys
+import time
+import types
+
+import communication
+
+# missing entry
+MISSING = object()
+
+# inserts of a process between removing the least recently used entries
+PRUNE_INTERVAL = 1000
+
+# lookups of a process between writing the times of use and the hit and miss counts
+FLUSH_INTERVAL = 1000
+
+
+def _canonical(value):
+    """Integral values as int, such that, e.g., 10 and 10.0 give the same signature."""
+    if value is not None and float(value).is_integer():
+        return int(value)
+    return value
+
+
+def chain_signature(chain) -> str:
+    """Canonical signature of (chain): (period, read phase, time from read- to write-event) of each task in order."""
+    return repr(tuple(
+        (_canonical(comm.period), _canonical(comm.read_phase), _canonical(comm.write_phase - comm.read_phase))
+        for comm in communication.policy_table(chain)
+    ))
+
+
+def _source_files(module_name) -> dict:
+    """Source files of a module and of all modules of the same directory which it uses, directly or indirectly
+    (found by the module objects, classes and functions among their global names), as name -> path."""
+    root = getattr(sys.modules.get(module_name), "__file__", None)
+    if root is None:
+        return dict()
+    directory = os.path.dirname(os.path.abspath(root))
+
+    files = dict()
+    stack = [sys.modules[module_name]]
+    while stack:
+        module = stack.pop()
+        path = getattr(module, "__file__", None)
+        if module.__name__ in files or path is None or os.path.dirname(os.path.abspath(path)) != directory:
+            continue
+        files[module.__name__] = path
+        for value in vars(module).values():
+            if not isinstance(value, types.ModuleType):
+                value = sys.modules.get(getattr(value, "__module__", None) or "")
+            if value is not None:
+                stack.append(value)
+    return files
+
+
+@functools.cache
+def _source_hash(module_name):
+    """Hash of the source files of an analysis module and of the modules it uses (see _source_files()).
+    (Entries of old versions of the analyses are not used.)"""
+    files = _source_files(module_name)
+    if not files:
+        return ""
+    sha = hashlib.sha1()
+    for path in sorted(set(files.values())):
+        with open(path, "rb") as file:
+            sha.update(os.path.basename(path).encode() + b"\0" + file.read())
+    return sha.hexdigest()[:16]
+
+
+class ResultCache:
+    """Results of analysis functions per chain signature in an SQLite database.
+    Picklable, so it can be passed to the workers of a multiprocessing.Pool (each process opens its own connection).
+    """
+
+    def __init__(self, path, max_entries=1_000_000):
+        """- path = SQLite database file (created if it does not exist)
+        - max_entries = maximal number of stored results"""
+        self.path = path
+        self.max_entries = max_entries
+        self._connection = None
+        self._pid = None
+        self._inserts = 0
+        self._lookups = 0
+        self._used = dict()  # (name, signature) -> time of the last use, not yet written
+        self._stats = collections.defaultdict(lambda: [0, 0])  # name -> [hits, misses], not yet written
+
+    def __getstate__(self):
+        """Pickle without the connection."""
+        return {"path": self.path, "max_entries": self.max_entries}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def connection(self):
+        """Connection of the current process."""
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=60)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(name TEXT, signature TEXT, value BLOB, used INTEGER, PRIMARY KEY (name, signature))"
+            )
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, hits INTEGER, misses INTEGER)"
+            )
+            self._connection.commit()
+            self._pid = os.getpid()
+            self._inserts = 0
+            self._lookups = 0
+            self._used = dict()
+            self._stats = collections.defaultdict(lambda: [0, 0])
+            # Pool workers only run the finalizers if the pool is closed and joined (see workers.run)
+            multiprocessing.util.Finalize(None, self.flush, exitpriority=10)
+        return self._connection
+
+    def get(self, name, signature):
+        """Stored result of (name) for (signature), MISSING if there is none.
+        Only reads the database; the time of use and the hit or miss are written later (see flush())."""
+        con = self.connection()
+        row = con.execute(
+            "SELECT value FROM results WHERE name = ? AND signature = ?", (name, signature)
+        ).fetchone()
+        hit = row is not None
+        if hit:
+            self._used[name, signature] = time.time_ns()
+        self._stats[name][0 if hit else 1] += 1
+        self._lookups += 1
+        if self._lookups % FLUSH_INTERVAL == 0:
+            self.flush()
+        return pickle.loads(row[0]) if hit else MISSING
+
+    def put(self, name, signature, value):
+        """Store the result (value) of (name) for (signature), together with the pending times of use and counts."""
+        con = self.connection()
+        with con:
+            con.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (name, signature, pickle.dumps(value), time.time_ns()),
+            )
+            self._write_pending(con)
+        self._inserts += 1
+        if self._inserts % PRUNE_INTERVAL == 0:
+            self.prune()
+
+    def _write_pending(self, con):
+        """Write the pending times of use and hit and miss counts of this process (in the transaction of con)."""
+        if self._used:
+            con.executemany(
+                "UPDATE results SET used = ? WHERE name = ? AND signature = ?",
+                [(used, name, signature) for (name, signature), used in self._used.items()],
+            )
+            self._used.clear()
+        if self._stats:
+            con.executemany(
+                "INSERT INTO stats VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+                [(name, hits, misses) for name, (hits, misses) in self._stats.items()],
+            )
+            self._stats.clear()
+
+    def flush(self):
+        """Write the pending times of use and hit and miss counts of this process."""
+        if self._connection is None or self._pid != os.getpid() or not (self._used or self._stats):
+            return
+        con = self._connection
+        with con:
+            self._write_pending(con)
+
+    def prune(self):
+        """Remove the least recently used results beyond max_entries."""
+        con = self.connection()
+        with con:
+            self._write_pending(con)
+            con.execute(
+                "DELETE FROM results WHERE rowid IN "
+                "(SELECT rowid FROM results ORDER BY used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def __len__(self):
+        return self.connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def hit_rates(self) -> dict:
+        """Hits, misses and hit rate per cached function (over all processes since clear_stats()).
+        Counts of other processes are included once they are written (at the latest when they exit)."""
+        self.flush()
+        rows = self.connection().execute("SELECT name, hits, misses FROM stats ORDER BY name").fetchall()
+        return {
+            name: {"hits": hits, "misses": misses, "hit_rate": hits / (hits + misses) if hits + misses else 0.0}
+            for name, hits, misses in rows
+        }
+
+    def clear_stats(self):
+        """Reset the hit and miss counters."""
+        con = self.connection()
+        self._stats.clear()
+        with con:
+            con.execute("DELETE FROM stats")
+
+    def clear(self):
+        """Remove all results and counters."""
+        con = self.connection()
+        self._used.clear()
+        self._stats.clear()
+        with con:
+            con.execute("DELETE FROM results")
+            con.execute("DELETE FROM stats")
+
+    def cached(self, fct):
+        """Wrapper of the analysis function fct(chain, *args) which looks up the result for the chain signature.
+        The arguments after the chain are part of the key."""
+        name = f"{fct.__module__}.{fct.__qualname__}@{_source_hash(fct.__module__)}"
+
+        @functools.wraps(fct)
+        def wrapper(chain, *args):
+            signature = chain_signature(chain) + repr(args)
+            value = self.get(name, signature)
+            if value is MISSING:
+                value = fct(chain, *args)
+                self.put(name, signature, value)
+            return value
+
+        return wrapper
+
+
+def cached(fct, cache: ResultCache = None):
+    """fct with results cached in (cache). (fct itself if there is no cache.)"""
+    return fct if cache is None else cache.cached(fct)
@@ -0,0 +1,220 @@
+"""Discrete-event simulation of cause-effect chains to validate the analyses.
+Each job reads the current data of the previous task at its read-event and writes it at its write-event
+(as given by the communication backends of the tasks, see communication.py).
+The data carries the time of the read-event of the first task (its origin).
+Observed values:
+- reaction time: from the read-event before an origin to the first actuation (write of the last task) with that origin
+- reduced reaction time: from the origin to that actuation
+- data age: from the origin of an actuation to the next actuation
+- reduced data age: from the origin of an actuation to the actuation
+Write-events happen before read-events at the same time (as in the analyses).
+Two engines:
+- simulate_events(): heap-based event queue, for arbitrary release times
+- simulate_vectorized(): all events of a task at once with NumPy (fast path for periodic tasks)"""
+import heapq
+import itertools
+from collections import deque
+
+import numpy as np
+
+import communication
+from cechain import CEChain
+
+# event kinds; writes before reads at the same time
+WRITE = 0
+READ = 1
+
+
+#####
+# Release times
+#####
+
+
+def periodic_releases(tsk, horizon):
+    """Release times of a periodic task up to (horizon)."""
+    return itertools.takewhile(
+        lambda time: time <= horizon,
+        (tsk.rel.phase + tsk.rel.period * number for number in itertools.count()),
+    )
+
+
+def simulation_horizon(chain: CEChain, hyperperiods=10):
+    """End of the simulation: (hyperperiods) hyperperiods plus the maximal phase,
+    plus the time for data to pass the chain (one period and the write offset of each task)."""
+    passing = sum(tsk.rel.period + comm.write_offset for tsk, comm in zip(chain, communication.policy_table(chain)))
+    return hyperperiods * chain.hyperperiod() + chain.max_phase() + passing
+
+
+def _observed(mrt, mrrt, mda, mrda, events):
+    """Result of a simulation. (None if no value was observed)"""
+    return {"mrt": mrt, "mrrt": mrrt, "mda": mda, "mrda": mrda, "events": events}
+
+
+#####
+# Event-based simulation
+#####
+
+
+def simulate_events(chain: CEChain, horizon=None, releases=None):
+    """Simulate (chain) with a heap-based event queue until (horizon).
+    - releases = iterables of release times, one per task (periodic releases if not given)
+    Events are tuples (time, kind, task index, origin)."""
+    if horizon is None:
+        horizon = simulation_horizon(chain)
+    if releases is None:
+        releases = [periodic_releases(tsk, horizon) for tsk in chain]
+    releases = [iter(rel) for rel in releases]
+    comms = communication.policy_table(chain)
+    last = len(chain) - 1
+
+    # first read-event of each task
+    queue = []
+    for idx, rel in enumerate(releases):
+        release = next(rel, None)
+        if release is not None:
+            queue.append((release + comms[idx].read_offset, READ, idx, None))
+    heapq.heapify(queue)
+
+    data = [None] * len(chain)  # origin of the current data of each task
+    stimuli = deque()  # (previous read-event, read-event) of the first task, waiting for their actuation
+    previous_read = None  # previous read-event of the first task
+    actuation = None  # (time, origin) of the previous actuation
+    mrt = mrrt = mda = mrda = None
+    events = 0
+
+    while queue:
+        time, kind, idx, origin = heapq.heappop(queue)
+        if time > horizon:
+            break
+        events += 1
+
+        if kind == READ:
+            comm = comms[idx]
+            if idx == 0:
+                origin = time
+                if previous_read is not None:
+                    stimuli.append((previous_read, time))
+                previous_read = time
+            else:
+                origin = data[idx - 1]
+            heapq.heappush(queue, (time - comm.read_offset + comm.write_offset, WRITE, idx, origin))
+
+            # next job
+            release = next(releases[idx], None)
+            if release is not None:
+                heapq.heappush(queue, (release + comm.read_offset, READ, idx, None))
+            continue
+
+        # kind == WRITE
+        data[idx] = origin
+        if idx != last or origin is None:
+            continue
+
+        # data age of the previous actuation
+        if actuation is not None and actuation[1] is not None:
+            age, reduced_age = time - actuation[1], actuation[0] - actuation[1]
+            mda = age if mda is None else max(mda, age)
+            mrda = reduced_age if mrda is None else max(mrda, reduced_age)
+        actuation = (time, origin)
+
+        # reaction times of all stimuli which reach the actuator now
+        while stimuli and stimuli[0][1] <= origin:
+            before, read = stimuli.popleft()
+            reaction, reduced_reaction = time - before, time - read
+            mrt = reaction if mrt is None else max(mrt, reaction)
+            mrrt = reduced_reaction if mrrt is None else max(mrrt, reduced_reaction)
+
+    return _observed(mrt, mrrt, mda, mrda, events)
+
+
+#####
+# Vectorized simulation
+#####
+
+
+def _event_times(chain, horizon):
+    """Read- and write-events of all jobs of each task up to (horizon) as arrays (periodic tasks)."""
+    reads, writes = [], []
+    for tsk, comm in zip(chain, communication.policy_table(chain)):
+        release = np.arange(tsk.rel.phase, horizon + 1, tsk.rel.period)
+        release = release[release <= horizon]
+        reads.append(release + comm.read_offset)
+        writes.append(release + comm.write_offset)
+    return reads, writes
+
+
+def simulate_vectorized(chain: CEChain, horizon=None):
+    """Simulate (chain) until (horizon) with all jobs of a task at once. Periodic tasks only.
+    Same results as simulate_events(), but the data of all jobs is propagated with np.searchsorted:
+    forward from each read of the first task to the first actuation, backward from each actuation to its origin."""
+    if horizon is None:
+        horizon = simulation_horizon(chain)
+    reads, writes = _event_times(chain, horizon)
+
+    # only write-events in the horizon are observed
+    observed = [np.count_nonzero(w <= horizon) for w in writes]
+
+    # reaction: forward from read n of the first task (n >= 1, the read before it is the earliest stimulus)
+    jobs = np.arange(1, len(reads[0]))
+    valid = np.ones(len(jobs), dtype=bool)
+    for idx in range(1, len(chain)):
+        # earliest read-event at or after the write-event (jobs writing after the horizon are not observed)
+        valid &= jobs < observed[idx - 1]
+        jobs = np.searchsorted(reads[idx], writes[idx - 1][np.minimum(jobs, observed[idx - 1] - 1)], side="left")
+    valid &= jobs < observed[-1]
+    actuations = writes[-1][jobs[valid]]
+    reaction = actuations - reads[0][:-1][valid]
+    reduced_reaction = actuations - reads[0][1:][valid]
+
+    # data age: backward from actuation k (its data is overwritten by actuation k + 1)
+    jobs = np.arange(observed[-1] - 1)
+    valid = np.ones(len(jobs), dtype=bool)
+    for idx in range(len(chain) - 2, -1, -1):
+        # latest write-event at or before the read-event
+        jobs = np.searchsorted(writes[idx], reads[idx + 1][jobs], side="right") - 1
+        valid &= jobs >= 0
+        jobs = np.maximum(jobs, 0)
+    origins = reads[0][jobs[valid]]
+    age = writes[-1][1 : observed[-1]][valid] - origins
+    reduced_age = writes[-1][: observed[-1] - 1][valid] - origins
+
+    def maximum(values):
+        return values.max().item() if len(values) > 0 else None
+
+    events = int(sum(np.count_nonzero(r <= horizon) for r in reads) + sum(observed))
+    return _observed(maximum(reaction), maximum(reduced_reaction), maximum(age), maximum(reduced_age), events)
+
+
+def simulate(chain: CEChain, hyperperiods=10, releases=None, horizon=None):
+    """Simulate (chain) for (hyperperiods) hyperperiods (see simulation_horizon()).
+    Periodic tasks are simulated with the vectorized simulation.
+    If (releases) are given (one iterable of release times per task), the event-based simulation is used until
+    (horizon)."""
+    if releases is None:
+        return simulate_vectorized(chain, simulation_horizon(chain, hyperperiods))
+    assert horizon is not None, "The horizon is required for given release times."
+    return simulate_events(chain, horizon, releases)
+
+
+if __name__ == "__main__":
+    """Debug"""
+    import timeit
+
+    import analysis
+    import benchmark_WATERS as bw
+
+    ce = None
+    while ce is None:
+        ts = bw.gen_taskset(0.7)
+        ce = bw.gen_ce_chain(ts)
+    for tsk in ts:
+        tsk.rel.phase = 0
+
+    print("analysis:", analysis.our_all(ce, repeat=1))
+    for engine in [simulate_events, simulate_vectorized]:
+        start = timeit.default_timer()
+        res = engine(ce)
+        duration = timeit.default_timer() - start
+        print(f"{engine.__name__}:", res, f"{res['events'] / duration:.0f} events/s")
+
+    breakpoint()
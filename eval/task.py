@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import functools
+from typing import NamedTuple
+
 
 ####################
 # Task.
@@ -6,6 +9,7 @@
 class Task:
     """A task."""
     features = ['rel', 'dl', 'ex', 'comm']
+    __slots__ = ('rel', 'dl', 'ex', 'comm')
 
     def __init__(self, *feature_objects):
         """Initialize a task instance."""
@@ -35,10 +39,78 @@ class Task:
             if hasattr(feat_obj, '_base_tsk') and feat_obj._base_tsk is None:
                 feat_obj._base_tsk = self
 
+        # attach all features (values which depend on other features are resolved here)
+        for feat in [getattr(self, f) for f in self.features if getattr(self, f) is not None]:
+            feat._attach()
+
         if __debug__:
             for feat in [getattr(self, f) for f in self.features if getattr(self, f) is not None]:
                 feat._check()
 
+    def __reduce__(self):
+        """Compact pickling: the interned signature if it describes the task completely (see signature()),
+        the feature objects otherwise (see _restore_task).
+        Tasks with the same signature share the record in the pickle."""
+        signature = self.signature()
+        if signature is not None:
+            return _task_from_signature, (type(self), signature)
+        return _restore_task, (type(self), self.rel, self.dl, self.ex, self.comm)
+
+    def __setstate__(self, state):
+        """Unpickle tasks which were pickled with their __dict__ (before Task had slots)."""
+        for name, value in _state_items(state):
+            setattr(self, name, value)
+        for feat in [getattr(self, f, None) for f in self.features]:
+            if feat is not None:
+                feat._attach()
+
+    @classmethod
+    def from_values(cls, period, phase=None, wcet=None, bcet=None, dl=None, comm=None):
+        """Fast construction of a periodic task without checks and reflection.
+        The values are trusted, i.e., they have to be checked before (e.g., by TaskSet.from_arrays()).
+        Only the deadline is checked, since it selects the deadline class.
+        - period, phase = periodic release pattern
+        - wcet, bcet = execution times (no execution feature if both are None)
+        - dl = relative deadline: implicit deadline if None, constrained deadline if dl <= period, arbitrary otherwise
+        - comm = communication policy (no communication feature if None)"""
+        tsk = cls.__new__(cls)
+
+        rel = Periodic.__new__(Periodic)
+        rel.maxiat = rel.miniat = rel.period = period
+        rel.phase = phase
+        tsk.rel = rel
+
+        if dl is None:
+            deadline = ImplicitDeadline.__new__(ImplicitDeadline)
+            deadline._base_tsk = tsk
+        elif not dl > 0:
+            raise ValueError(f'Positive value expected for dl. Received {dl=}.')
+        elif dl <= period:
+            deadline = ConstrainedDeadline.__new__(ConstrainedDeadline)
+            deadline._base_tsk = tsk
+            deadline.dl = dl
+        else:
+            deadline = ArbitraryDeadline.__new__(ArbitraryDeadline)
+            deadline.dl = dl
+        tsk.dl = deadline
+
+        if wcet is None and bcet is None:
+            tsk.ex = None
+        else:
+            ex = BCWCExecution.__new__(BCWCExecution)
+            ex.bcet = bcet
+            ex.wcet = wcet
+            tsk.ex = ex
+
+        if comm is None:
+            tsk.comm = None
+        else:
+            communication = Communication.__new__(Communication)
+            communication.type = comm
+            tsk.comm = communication
+
+        return tsk
+
     def print(self):
         """Quick print of all features for debugging."""
         print(self)
@@ -49,12 +121,108 @@ class Task:
         """Task utilization."""
         return self.ex.wcet / self.rel.miniat
 
+    def signature(self):
+        """Interned TaskSignature of the task.
+        None if the task is not described completely by a signature, i.e., if it cannot be built by from_values()
+        (e.g., sporadic tasks or arbitrary deadlines which are not larger than the period).
+        The signature is computed from the current values (phases and deadlines may change after creation)."""
+        rel, dl, ex, comm = self.rel, self.dl, self.ex, self.comm
+        if type(rel) is not Periodic or rel.miniat != rel.period or rel.maxiat != rel.period:
+            return None
+        if type(dl) is ImplicitDeadline:
+            if dl.dl != rel.period:
+                return None
+        elif type(dl) is ConstrainedDeadline:
+            if dl.dl is None or not 0 < dl.dl <= rel.period:
+                return None
+        elif type(dl) is ArbitraryDeadline:
+            if dl.dl is None or not dl.dl > rel.period:
+                return None
+        else:
+            return None
+        if ex is not None and (type(ex) is not BCWCExecution or (ex.wcet is None and ex.bcet is None)):
+            return None
+        if comm is not None and type(comm) is not Communication:
+            return None
+
+        return intern_signature(TaskSignature(
+            period=rel.period,
+            phase=rel.phase,
+            dl=dl.dl,
+            wcet=None if ex is None else ex.wcet,
+            comm=None if comm is None else comm.type,
+            bcet=None if ex is None else ex.bcet,
+            implicit=type(dl) is ImplicitDeadline,
+        ))
+
+
+####################
+# Task signatures.
+####################
+class TaskSignature(NamedTuple):
+    """Immutable parameters of a periodic task, as built by Task.from_values().
+    Tasks with the same signature cannot be distinguished by the analyses."""
+    period: float
+    phase: float
+    dl: float
+    wcet: float
+    comm: str
+    bcet: float = None
+    implicit: bool = False  # implicit deadline (dl = period)
+
+
+# interned signatures: (signature, types of its values) -> shared signature record
+_signatures = dict()
+
+
+def intern_signature(signature: TaskSignature) -> TaskSignature:
+    """Shared record for all equal signatures.
+    (The types are part of the key, such that, e.g., periods 10 and 10.0 are not mixed up.)"""
+    key = (signature, tuple(map(type, signature)))
+    try:
+        return _signatures[key]
+    except KeyError:
+        _signatures[key] = signature
+        return signature
+
+
+def _task_from_signature(cls, signature):
+    """Unpickle a task from its signature (see Task.__reduce__)."""
+    return cls.from_values(
+        signature.period,
+        phase=signature.phase,
+        wcet=signature.wcet,
+        bcet=signature.bcet,
+        dl=None if signature.implicit else signature.dl,
+        comm=signature.comm,
+    )
+
+
+def _restore_task(cls, rel, dl, ex, comm):
+    """Unpickle a task (see Task.__reduce__). Features with a base task get the restored task."""
+    tsk = cls.__new__(cls)
+    tsk.rel, tsk.dl, tsk.ex, tsk.comm = rel, dl, ex, comm
+    for feat in (rel, dl, ex, comm):
+        if hasattr(feat, '_base_tsk'):
+            feat._base_tsk = tsk
+    return tsk
+
+
+def _state_items(state):
+    """Attributes of a pickled __dict__ state, which is a dictionary or a tuple (dictionary, slots)."""
+    if isinstance(state, tuple):
+        for part in state:
+            yield from (part or dict()).items()
+    else:
+        yield from state.items()
+
 
 ####################
 # Task Features.
 ####################
 class TaskFeature:
     """A task feature, which can be added to a task."""
+    __slots__ = ()
     _properties = []  # properties added to the task feature
 
     def __str__(self):
@@ -66,10 +234,41 @@ class TaskFeature:
         # breakpoint()
         pass
 
+    def _attach(self):
+        """Called when the feature is added to a task (after all features are added)."""
+        pass
+
+    def __reduce__(self):
+        """Compact pickling: class and slot values only. (The base task is set by the task, see _restore_task.)"""
+        return _restore_feature, (type(self), *[getattr(self, slot, None) for slot in _pickled_slots(type(self))])
+
+    def __setstate__(self, state):
+        """Unpickle features which were pickled with their __dict__ (before the features had slots)."""
+        for name, value in _state_items(state):
+            setattr(self, name, value)
+
+
+@functools.cache
+def _pickled_slots(cls):
+    """Slots of a feature class and all its base classes, without the base task."""
+    return tuple(slot for klass in reversed(cls.__mro__) for slot in getattr(klass, '__slots__', ())
+                 if slot != '_base_tsk')
+
+
+def _restore_feature(cls, *values):
+    """Unpickle a feature (see TaskFeature.__reduce__)."""
+    feat = cls.__new__(cls)
+    for slot, value in zip(_pickled_slots(cls), values):
+        setattr(feat, slot, value)
+    if hasattr(cls, '_base_tsk'):
+        feat._base_tsk = None
+    return feat
+
 
 # Task Features: Release Pattern
 class ReleasePattern(TaskFeature):
     """Basic release pattern feature."""
+    __slots__ = ()
     _name = 'rel'  # name of the pattern (and all subpatterns)
     type = None  # distinguish different types (also to check if analyses can be applied)
 
@@ -78,6 +277,7 @@ class ReleasePattern(TaskFeature):
 
 class Sporadic(ReleasePattern):
     """Sporadic release pattern."""
+    __slots__ = ('maxiat', 'miniat')
     type = 'sporadic'  # type of the release pattern
 
     _properties = ReleasePattern._properties + ['miniat', 'maxiat']  # properties for sporadic release pattern
@@ -107,6 +307,7 @@ class Sporadic(ReleasePattern):
 
 class Periodic(Sporadic):
     """Periodic release pattern."""
+    __slots__ = ('period', 'phase')
     type = 'periodic'  # type of the release pattern
 
     _properties = Sporadic._properties + ['period', 'phase']  # additional properties for Periodic release pattern
@@ -129,10 +330,17 @@ class Periodic(Sporadic):
         if self.period is not None and self.period < 0:
             raise ValueError(f'Non-negative value expected for period. Received {self.period=}.')
 
+    def __reduce__(self):
+        """Compact pickling: period and phase only, if the inter-arrival times are the period."""
+        if self.miniat == self.period and self.maxiat == self.period:
+            return Periodic, (self.period, self.phase)
+        return super().__reduce__()
+
 
 # Task Features: Deadline
 class Deadline(TaskFeature):
     """Basic deadline feature."""
+    __slots__ = ()
     _name = 'dl'  # name of deadline feature
     type = None  # distinguish different types (also to check if analyses can be applied)
 
@@ -141,6 +349,7 @@ class Deadline(TaskFeature):
 
 class ArbitraryDeadline(Deadline):
     """Arbitrary deadlines."""
+    __slots__ = ('dl',)
     type = 'arbitrary'  # type of the deadline feature
     _properties = Deadline._properties + ['dl']  # add dl to properties
 
@@ -152,6 +361,7 @@ class ArbitraryDeadline(Deadline):
 
 class ConstrainedDeadline(ArbitraryDeadline):
     """Constrained deadlines."""
+    __slots__ = ('_base_tsk',)
     type = 'constrained'  # type of the deadline feature
 
     def __init__(self, dl=None, base_tsk=None):
@@ -174,7 +384,10 @@ class ConstrainedDeadline(ArbitraryDeadline):
 
 
 class ImplicitDeadline(ConstrainedDeadline):
-    """Implicit deadlines."""
+    """Implicit deadlines.
+    The deadline is always the minimum inter-arrival time of the base task (read on access, hence it follows changes
+    of the release pattern). The slot dl of the base class is not used."""
+    __slots__ = ()
     type = 'implicit'  # type of the deadline feature
 
     def __init__(self, base_tsk=None):
@@ -186,21 +399,15 @@ class ImplicitDeadline(ConstrainedDeadline):
     # dl getter and setter
     @property
     def dl(self):
-        """Deadline is always the minimum inter-arrival time of a task."""
-        if (hasattr(self, '_base_tsk')
-                and hasattr(self._base_tsk, 'rel')
-                and hasattr(self._base_tsk.rel, 'miniat')):
-            return self._base_tsk.rel.miniat
-        else:
-            return None
+        """Deadline is always the minimum inter-arrival time of the base task. (None if not available)"""
+        rel = getattr(self._base_tsk, 'rel', None)
+        return getattr(rel, 'miniat', None)
 
     @dl.setter
     def dl(self, value):
         """No setting allowed, just a quick check."""
         if value is not None and self.dl is not None and self.dl != value:
             raise ValueError(f'DL=miniat expected for implicit deadline tasks. Want to set {self.dl=} to {value=}?')
-        else:
-            pass
 
 
 # Task Features: Execution Behavior
@@ -208,6 +415,7 @@ class ImplicitDeadline(ConstrainedDeadline):
 # TODO this place can also be used to implement tasks with probabilistic execution behavior
 class Execution(TaskFeature):
     """Execution time specification."""
+    __slots__ = ()
     _name = 'ex'  # name of execution time specification feature
     type = None  # distinguish different types (also to check if analyses can be applied)
 
@@ -216,6 +424,7 @@ class Execution(TaskFeature):
 
 class BCWCExecution(Execution):
     """Best-case and worst-case execution time."""
+    __slots__ = ('bcet', 'wcet')
     type = 'bcwc'  # type of the execution feature
     _properties = Execution._properties + ['bcet', 'wcet']  # add bcet and wcet to properties
 
@@ -245,6 +454,7 @@ class BCWCExecution(Execution):
 # Task Features: Communication Policy
 class Communication(TaskFeature):
     """Communication policy."""
+    __slots__ = ('type',)
     _name = 'comm'  # name of communication policy feature
     _comm_possibilities = ('implicit', 'LET')  # possible types of the communication feature
 
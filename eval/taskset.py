@@ -1,6 +1,12 @@
 #!/usr/bin/env python3
+import fractions
 import math
 
+import numpy as np
+
+import communication
+import task
+
 
 class TaskSet:
     """A set of Task-Objects.
@@ -11,6 +17,7 @@ class TaskSet:
     def __init__(self, *args):
         """Input: Task-Objects"""
         self._lst = list(args)
+        self._views = dict()  # cached views, see view()
 
     def __len__(self):
         return self._lst.__len__()
@@ -20,15 +27,71 @@ class TaskSet:
 
     def __setitem__(self, key, value):
         self._lst.__setitem__(key, value)
+        self.invalidate()
 
     def __delitem__(self, key):
         self._lst.__delitem__(key)
+        self.invalidate()
 
     def __iter__(self):
         yield from self._lst
 
     def append(self, obj):
         self._lst.append(obj)
+        self.invalidate()
+
+    def invalidate(self):
+        """Drop all values derived from the tasks: cached views, WCRTs and policy tables (see communication.py).
+        Called when the tasks change; call it after changing task parameters in place."""
+        self._views = dict()
+        self.__dict__.pop('wcrts', None)
+        communication.invalidate(self)
+
+    def __getstate__(self):
+        """Pickle without the cached views."""
+        state = self.__dict__.copy()
+        state.pop('_views', None)
+        return state
+
+    def view(self, start=0, stop=None):
+        """View of self[start:stop] without copying the tasks. (Non-negative start and stop, views are cached.)"""
+        try:
+            return self._views[start, stop]
+        except KeyError:
+            pass
+        except AttributeError:  # task sets created before views existed
+            self._views = dict()
+        length = len(self._lst)
+        view = TaskSetView(self, min(start, length), length if stop is None else min(max(start, stop), length))
+        self._views[start, stop] = view
+        return view
+
+    @classmethod
+    def from_arrays(cls, period, phase=None, wcet=None, bcet=None, dl=None, comm=None):
+        """Task set of periodic tasks from columns of values (one entry per task, ordered by priority).
+        The columns are checked at once (same checks as the _check() functions of the task features),
+        then the tasks are built by task.Task.from_values() without further checks.
+        - phase, wcet, bcet, dl = columns or None (see task.Task.from_values())
+        - comm = communication policy of all tasks, or a column of policies"""
+        length = len(period)
+        if isinstance(comm, str):
+            comm = [comm] * length
+        columns = {'period': period, 'phase': phase, 'wcet': wcet, 'bcet': bcet, 'dl': dl, 'comm': comm}
+        for name, column in columns.items():
+            if column is not None and len(column) != length:
+                raise ValueError(f'Expected {length} values for {name}. Received {len(column)}.')
+
+        if __debug__:
+            _check_columns(period, wcet, bcet, comm)
+
+        # python values (no numpy scalars in the tasks)
+        values = [[None] * length if column is None else np.asarray(column).tolist() for column in columns.values()]
+        return cls(*[task.Task.from_values(*tsk_values) for tsk_values in zip(*values)])
+
+    def signature(self):
+        """Interned signatures of the tasks in order (see task.Task.signature()).
+        Task sets with equal signatures cannot be distinguished by the analyses."""
+        return tuple(tsk.signature() for tsk in self._lst)
 
     def prio(self, tsk):
         """Priority of a task"""
@@ -86,10 +149,11 @@ class TaskSet:
         self.wcrts = dict()
         for idx in range(len(self._lst)):
             self.wcrts[self._lst[idx]] = tda(self._lst[idx], self._lst[:idx])
+        communication.invalidate(self)  # backends with the previous WCRTs
 
     def hyperperiod(self):
         """Task set hyperperiod."""
-        assert all([tsk.rel.period.is_integer() for tsk in self._lst]), "Not all periods are integers."
+        assert all([float(tsk.rel.period).is_integer() for tsk in self._lst]), "Not all periods are integers."
         return math.lcm(*[int(tsk.rel.period) for tsk in self._lst])
 
     def max_phase(self):
@@ -99,6 +163,58 @@ class TaskSet:
     def sort_dm(self):
         """Sort by deadline."""
         self._lst.sort(key=lambda x: x.dl.dl)
+        self.invalidate()
+
+
+class TaskSetView:
+    """Read-only view of the tasks taskset[start:stop] (a range over the list of the task set)."""
+    __slots__ = ('taskset', 'start', 'stop')
+
+    def __init__(self, taskset, start, stop):
+        self.taskset = taskset
+        self.start = start
+        self.stop = stop
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self[idx] for idx in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError('TaskSetView index out of range')
+        return self.taskset._lst[self.start + item]
+
+    def __iter__(self):
+        lst = self.taskset._lst
+        for idx in range(self.start, self.stop):
+            yield lst[idx]
+
+
+def _check_columns(period, wcet=None, bcet=None, comm=None):
+    """Vectorized checks of TaskSet.from_arrays()."""
+    def first_violation(name, values, violated):
+        if np.any(violated):
+            idx = int(np.argmax(violated))
+            raise ValueError(f'Non-negative value expected for {name}. Received {name}={values[idx]} of task {idx}.')
+
+    period = np.asarray(period, dtype=float)
+    first_violation('period', period, period < 0)
+    if wcet is not None:
+        wcet = np.asarray(wcet, dtype=float)
+        first_violation('wcet', wcet, wcet < 0)
+    if bcet is not None:
+        bcet = np.asarray(bcet, dtype=float)
+        first_violation('bcet', bcet, bcet < 0)
+    if wcet is not None and bcet is not None and np.any(bcet > wcet):
+        idx = int(np.argmax(bcet > wcet))
+        raise ValueError(f'Expected bcet <= wcet. Received bcet={bcet[idx]} > wcet={wcet[idx]} of task {idx}.')
+    if comm is not None:
+        invalid = set(comm) - set(task.Communication._comm_possibilities)
+        if invalid:
+            raise ValueError(f'Expected type in {task.Communication._comm_possibilities=}. Received {invalid}.')
 
 
 def transform(taskset, precision=10000000):
@@ -130,6 +246,71 @@ def transform(taskset, precision=10000000):
                     setattr(feat, targarg,
                             int(tsk_vals[targ][targarg] * precision))
 
+    taskset.invalidate()
+
+
+# time values of the tasks which define the time base
+time_arguments = {
+    'rel': ['maxiat', 'miniat', 'period', 'phase'],
+    'dl': ['dl'],
+}
+
+
+def _time_values(tsk):
+    """All time values of a task as (feature, argument, value)."""
+    for targ in time_arguments:
+        tsk_feat = getattr(tsk, targ, None)
+        for targarg in time_arguments[targ]:
+            if tsk_feat is not None and getattr(tsk_feat, targarg, None) is not None:
+                yield targ, targarg, getattr(tsk_feat, targarg)
+
+
+def time_scale(taskset, max_denominator=1000000, tasks=None):
+    """Minimal integer scale such that all periods, phases, inter-arrival times and deadlines of (tasks) are integers,
+    as well as the WCRTs of the tasks with implicit communication (their write-events, see communication.py).
+    - tasks = tasks of taskset which define the time base (e.g., the tasks of a cause-effect chain), all if None
+    Float values are read as the closest fraction with denominator at most max_denominator."""
+    tasks = taskset if tasks is None else tasks
+    values = [value for tsk in tasks for _, _, value in _time_values(tsk)]
+    implicit = [tsk for tsk in tasks if communication.policy(tsk) == 'implicit']
+    if implicit:
+        if not hasattr(taskset, 'wcrts'):
+            taskset.compute_wcrts()
+        values += [taskset.wcrts[tsk] for tsk in implicit]
+
+    scale = 1
+    for value in values:
+        scale = math.lcm(scale, fractions.Fraction(value).limit_denominator(max_denominator).denominator)
+    return scale
+
+
+def transform_exact(taskset, max_denominator=1000000, tasks=None):
+    """Exact integer time base: Multiplies all values of each task with the minimal scale from time_scale().
+    Periods, phases, inter-arrival times and deadlines of (tasks) become exact integers, execution times are scaled
+    only. The other tasks of taskset are scaled as well (integers if possible, floats otherwise), such that the WCRTs
+    stay consistent, but they do not enlarge the scale.
+    Compared to transform(), the hyperperiod (and with it the analysis window) is as small as possible.
+    - tasks = tasks which define the time base, e.g., the tasks of a chain (all tasks of taskset if None)
+    Returns the scale."""
+    scale = time_scale(taskset, max_denominator, tasks)
+
+    for tsk in taskset:
+        # compute all values first (the implicit deadline follows the inter-arrival time)
+        tsk_vals = [
+            (targ, targarg, fractions.Fraction(value).limit_denominator(max_denominator) * scale)
+            for targ, targarg, value in _time_values(tsk)
+        ]
+        for targ, targarg, value in tsk_vals:
+            setattr(getattr(tsk, targ), targarg, int(value) if value.denominator == 1 else float(value))
+
+        if tsk.ex is not None:
+            for targarg in ['wcet', 'bcet']:
+                if getattr(tsk.ex, targarg, None) is not None:
+                    setattr(tsk.ex, targarg, getattr(tsk.ex, targarg) * scale)
+
+    taskset.invalidate()
+    return scale
+
 
 def tda(tsk, hp_tsks):
     """Implementation of TDA to calculate worst-case response time.
@@ -157,27 +338,62 @@ def _workload(period, wcet, time):
 
 if __name__ == '__main__':
     """Debug."""
-    import task
-
-    task.Periodic()
-
-    tset = (
-        task.Task(
-            task.Periodic(period=10, phase=1),
-            task.BCWCExecution(wcet=1 / 3),
-            task.Communication('LET')
-        ),
-        task.Task(
-            task.Periodic(period=20, phase=10),
-            task.BCWCExecution(wcet=1 / 2),
-            task.Communication('implicit')
-        ),
-        task.Task(
-            task.Periodic(period=50, phase=5),
-            task.BCWCExecution(wcet=1 / 7),
-            task.Communication('LET')
-        ),
-    )
-
-    ts = TaskSet(*tset)
+    debug_switch = 0
+
+    if debug_switch in [0, 1]:
+        tset = (
+            task.Task(
+                task.Periodic(period=10, phase=1),
+                task.BCWCExecution(wcet=1 / 3),
+                task.Communication('LET')
+            ),
+            task.Task(
+                task.Periodic(period=20, phase=10),
+                task.BCWCExecution(wcet=1 / 2),
+                task.Communication('implicit')
+            ),
+            task.Task(
+                task.Periodic(period=50, phase=5),
+                task.BCWCExecution(wcet=1 / 7),
+                task.Communication('LET')
+            ),
+        )
+
+        ts = TaskSet(*tset)
+
+    if debug_switch in [0, 2]:  # Memory of a sweep with 10000 systems (as created in __main__.py)
+        import pickle
+        import timeit
+        import tracemalloc
+
+        import benchmark_WATERS as bw
+
+        def make_system():
+            ce = None
+            while ce is None:
+                ts = bw.gen_taskset_periods(np.random.randint(50, 101))
+                ce = bw.gen_ce_chain(ts)
+            for tsk in ts:
+                tsk.rel.phase = 0
+            return ce
+
+        tracemalloc.start()
+        start = timeit.default_timer()
+        ces = [make_system() for _ in range(10000)]
+        duration = timeit.default_timer() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = timeit.default_timer()
+        data = pickle.dumps(ces)
+        duration_dump = timeit.default_timer() - start
+        start = timeit.default_timer()
+        pickle.loads(data)
+        duration_load = timeit.default_timer() - start
+        print(
+            f"tasks={sum(len(ce.base_ts) for ce in ces)}",
+            f"memory={memory / 2 ** 20:.1f}MiB ({duration:.1f}s)",
+            f"pickle={len(data) / 2 ** 20:.1f}MiB (dump {duration_dump:.1f}s, load {duration_load:.1f}s)",
+        )
+
     breakpoint()
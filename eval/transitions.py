@@ -0,0 +1,115 @@
+"""Transition tables between the jobs of consecutive tasks under LET.
+For periodic tasks, the immediate forward (backward) job of the next (previous) task is periodic in the job number:
+After lcm(periods) / period jobs, the job number of the other task increases by lcm(periods) / other period.
+(The lcm of the two periods divides the hyperperiod.)
+Hence, job chains can be composed by table lookups.
+The tables only depend on the LET signatures (period, read phase, time from read- to write-event) of the two tasks
+and are cached over all chains of a sweep with an LRU cache."""
+import functools
+import math
+
+import communication
+
+# maximal number of cached transition tables
+CACHE_SIZE = 4096
+
+
+def _int(value):
+    """value as int. Transition tables require integral periods, phases and deadlines."""
+    assert float(value).is_integer(), f"{value=} is not integral."
+    return int(value)
+
+
+def let_signature(comm):
+    """LET signature (period, read phase, time from read- to write-event) of a task with communication backend (comm),
+    the only values transition tables depend on. (Under LET: period, phase, deadline.)"""
+    return (
+        _int(comm.period),
+        _int(comm.read_phase),
+        _int(comm.write_phase - comm.read_phase),
+    )
+
+
+class TransitionTable:
+    """Job number mappings between the jobs of a task and the jobs of the next task under LET."""
+
+    def __init__(self, signature, next_signature):
+        """Precompute the mappings for one hyperperiod of the two tasks.
+        - signature, next_signature = LET signatures of the task and the next task (see let_signature())"""
+        period, phase, dl = signature
+        next_period, next_phase, _ = next_signature
+
+        hyperperiod = math.lcm(period, next_period)
+        self.jobs = hyperperiod // period  # jobs of the task per hyperperiod of the pair
+        self.next_jobs = hyperperiod // next_period  # jobs of the next task per hyperperiod of the pair
+
+        # earliest job of the next task with read-event at or after the write-event of job n of the task
+        self.fw = [
+            -((next_phase - phase - period * n - dl) // next_period)
+            for n in range(self.jobs)
+        ]
+        # latest job of the task with write-event at or before the read-event of job n of the next task
+        self.bw = [
+            (next_phase + next_period * n - phase - dl) // period
+            for n in range(self.next_jobs)
+        ]
+
+    def forward(self, number):
+        """Number of the job of the next task in the immediate forward job chain of job (number) of the task.
+        (Not smaller than 0, as let_re_geq in analysis.py.)"""
+        q, r = divmod(number, self.jobs)
+        return max(self.fw[r] + q * self.next_jobs, 0)
+
+    def backward(self, number):
+        """Number of the job of the task in the immediate backward job chain of job (number) of the next task."""
+        q, r = divmod(number, self.next_jobs)
+        return self.bw[r] + q * self.jobs
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def transition_table(signature, next_signature) -> TransitionTable:
+    """Transition table between tasks with LET signatures (signature) and (next_signature). (cached)"""
+    return TransitionTable(signature, next_signature)
+
+
+def chain_tables(chain) -> list[TransitionTable]:
+    """Transition tables of all consecutive task pairs of (chain)."""
+    signatures = [let_signature(comm) for comm in communication.policy_table(chain)]
+    return [
+        transition_table(signatures[idx], signatures[idx + 1])
+        for idx in range(len(chain) - 1)
+    ]
+
+
+def forward_number(tables, number):
+    """Number of the last job in the immediate forward job chain of job (number) through the transition tables."""
+    for table in tables:
+        q, r = divmod(number, table.jobs)
+        number = table.fw[r] + q * table.next_jobs
+        if number < 0:
+            number = 0
+    return number
+
+
+def backward_number(tables, number):
+    """Number of the first job in the immediate backward job chain of job (number) through the transition tables."""
+    for table in reversed(tables):
+        q, r = divmod(number, table.next_jobs)
+        number = table.bw[r] + q * table.jobs
+    return number
+
+
+def forward_numbers(tables, number):
+    """Job numbers of the immediate forward job chain of job (number) through the transition tables."""
+    numbers = [number]
+    for table in tables:
+        numbers.append(table.forward(numbers[-1]))
+    return numbers
+
+
+def backward_numbers(tables, number):
+    """Job numbers of the immediate backward job chain of job (number) through the transition tables."""
+    numbers = [number]
+    for table in reversed(tables):
+        numbers.append(table.backward(numbers[-1]))
+    return numbers[::-1]
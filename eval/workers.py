@@ -0,0 +1,75 @@
+"""Worker processes for the analyses (stage 2 of __main__.py).
+The configuration (analysis, repeat, count, cache) is sent once to each worker by the pool initializer.
+The chains are shared storage: forked workers inherit them from the parent process, other workers load them once
+from the stored pickle. Hence, the tasks are only the indices of the chains, and only the results are sent back.
+Each worker seeds its own RNG and is pinned to one CPU (round robin), such that its timing measurements do not
+migrate between CPUs.
+Only the analysis modules are imported by the workers (no scipy or matplotlib)."""
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+import helpers
+
+# chains shared with the workers (set in the parent process before the pool is created)
+_chains = None
+
+# configuration of the current worker process (see init_worker)
+_config = dict()
+
+
+def share(chains):
+    """Share (chains) with the workers of pools created afterwards. Forked workers inherit them without pickling."""
+    global _chains
+    _chains = chains
+
+
+def init_worker(config, counter, chains_path=None):
+    """Pool initializer: store the configuration, get the shared chains, seed the RNG, and pin the worker to one CPU.
+    - config = dictionary with analysis, repeat, count, cache, seed and pin
+    - counter = multiprocessing.Value to number the workers
+    - chains_path = pickle file of the chains (only loaded if the chains are not inherited)"""
+    global _chains, _config
+    _config = config
+
+    with counter.get_lock():
+        counter.value += 1
+        worker = counter.value
+
+    if _chains is None:
+        if chains_path is None:
+            raise RuntimeError("The chains are neither inherited nor stored in a file.")
+        _chains = helpers.load_data(chains_path)
+
+    # per-worker RNG
+    random.seed(config["seed"] + worker)
+    np.random.seed(config["seed"] + worker)
+
+    # one CPU per worker (round robin over the CPUs available to the process)
+    if config["pin"] and hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[worker % len(cpus)]})
+
+
+def analyze(idx):
+    """Analyze the shared chain with index (idx) with the configured analysis."""
+    return _config["analysis"](_chains[idx], _config["repeat"], _config["count"], _config["cache"])
+
+
+def run(analysis, chains, processes, chains_path=None, repeat=10, count=False, cache=None, seed=0, pin=True):
+    """Results of analysis(chain, repeat, count, cache) for all (chains) with (processes) worker processes,
+    in the order of chains.
+    - chains_path = pickle file of the chains, for workers which are not forked
+    - seed = base seed of the per-worker RNGs
+    - pin = pin each worker to one CPU"""
+    share(chains)
+    config = {"analysis": analysis, "repeat": repeat, "count": count, "cache": cache, "seed": seed, "pin": pin}
+    counter = multiprocessing.Value("i", 0)
+    with multiprocessing.Pool(processes, initializer=init_worker, initargs=(config, counter, chains_path)) as p:
+        results = p.map(analyze, range(len(chains)))
+        # let the workers exit normally, such that their finalizers run (e.g., dumping the profiles)
+        p.close()
+        p.join()
+    return results